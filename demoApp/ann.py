@@ -0,0 +1,173 @@
+"""
+Approximate nearest-neighbor search over article vectors, in pure NumPy.
+
+IVFIndex clusters the (L2-normalized) vectors with k-means into n_lists
+inverted lists. A query is scored only against the members of its n_probe
+closest centroids, so n_probe is the recall vs. latency knob: n_probe=n_lists
+is exact search.
+
+The index answers the same top_k(i, k, exclude) and weighted_sum(rows, weights)
+calls as the neighbor table, so it can be passed wherever similarity_matrix is,
+including profile recommendations; only single-item lookups are approximate.
+Build it from the embeddings and serve it with CBRS_SIMILARITY=ivf:
+
+    python ann.py data/embeddings data/ivf --n-probe 8
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+
+
+def normalize_rows(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def kmeans(vectors, n_clusters:int, n_iter:int=20, sample_size:int=100_000, seed:int=0):
+    # spherical k-means on a sample, enough to place the centroids
+    rng = np.random.default_rng(seed)
+    sample = vectors[rng.choice(vectors.shape[0], size=min(sample_size, vectors.shape[0]), replace=False)]
+    centroids = sample[rng.choice(sample.shape[0], size=n_clusters, replace=False)]
+    for _ in range(n_iter):
+        assign = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, sample)
+        empty = np.bincount(assign, minlength=n_clusters) == 0
+        # re-seed empty clusters from random sample points
+        sums[empty] = sample[rng.choice(sample.shape[0], size=int(empty.sum()))]
+        centroids = normalize_rows(sums)
+    return centroids
+
+
+class IVFIndex:
+    def __init__(self, vectors, centroids, list_ptr, list_ids, n_probe:int=8):
+        self.vectors = vectors
+        self.centroids = centroids
+        self.list_ptr = list_ptr
+        self.list_ids = list_ids
+        self.n_probe = n_probe
+
+    @classmethod
+    def build(cls, vectors, n_lists:int=None, n_probe:int=8, n_iter:int=20, seed:int=0, block_size:int=65536):
+        vectors = normalize_rows(vectors)
+        n = vectors.shape[0]
+        n_lists = n_lists or max(1, int(np.sqrt(n)))
+        centroids = kmeans(vectors, min(n_lists, n), n_iter=n_iter, seed=seed)
+
+        assign = np.concatenate([
+            np.argmax(vectors[start:start + block_size] @ centroids.T, axis=1)
+            for start in range(0, n, block_size)
+        ])
+        list_ids = np.argsort(assign, kind="stable").astype(np.int32)
+        list_ptr = np.zeros(centroids.shape[0] + 1, dtype=np.int64)
+        np.cumsum(np.bincount(assign, minlength=centroids.shape[0]), out=list_ptr[1:])
+        return cls(vectors, centroids, list_ptr, list_ids, n_probe=n_probe)
+
+    def __len__(self):
+        return self.vectors.shape[0]
+
+    @property
+    def shape(self):
+        return (len(self), len(self))
+
+    def search(self, query, k:int=10, n_probe:int=None, exclude=None):
+        """Top-k (ids, cosine scores) for one query vector, best first."""
+        n_probe = min(n_probe or self.n_probe, self.centroids.shape[0])
+        query = normalize_rows(np.atleast_2d(query))[0]
+
+        centroid_scores = self.centroids @ query
+        probe = np.argpartition(-centroid_scores, n_probe - 1)[:n_probe]
+        candidates = np.concatenate([self.list_ids[self.list_ptr[c]:self.list_ptr[c + 1]] for c in probe])
+        if exclude is not None:
+            candidates = candidates[~np.isin(candidates, exclude)]
+
+        scores = self.vectors[candidates] @ query
+        m = min(k, candidates.shape[0])
+        if m < candidates.shape[0]:
+            part = np.argpartition(-scores, m - 1)[:m]
+        else:
+            part = np.arange(candidates.shape[0])
+        order = part[np.argsort(-scores[part], kind="stable")]
+        return candidates[order].astype(np.intp), scores[order]
+
+    def top_k(self, i:int, k:int=10, exclude=None):
+        return self.search(self.vectors[i], k=k, exclude=exclude)
+
+    def weighted_sum(self, rows, weights):
+        # profile scores are exact, as in ArticleEmbeddings: V @ (sum_j w_j * v_j)
+        profile = np.asarray(weights, dtype=np.float32) @ np.asarray(self.vectors[rows])
+        return self.vectors @ profile
+
+    def top_k_block(self, rows, k:int=10, exclude_self:bool=True):
+        # padded (len(rows), k) arrays, matching NeighborTable.top_k_block
+        out_idx = np.full((len(rows), k), -1, dtype=np.intp)
+        out_scores = np.full((len(rows), k), np.nan)
+        for r, i in enumerate(rows):
+            idx, scores = self.top_k(i, k=k, exclude=[i] if exclude_self else None)
+            out_idx[r, :idx.shape[0]] = idx
+            out_scores[r, :idx.shape[0]] = scores
+        return out_idx, out_scores
+
+
+def exact_search(vectors, query, k:int=10, exclude=None, normalized:bool=False):
+    # brute-force reference for recall checks; normalized=True skips re-normalizing the rows
+    if not normalized:
+        vectors = normalize_rows(vectors)
+    scores = vectors @ normalize_rows(np.atleast_2d(query))[0]
+    if exclude is not None:
+        scores[np.asarray(exclude)] = -np.inf
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[np.argsort(-scores[top], kind="stable")]
+    return top, scores[top]
+
+
+def recall_at_k(index:IVFIndex, k:int=10, n_queries:int=200, n_probe:int=None, seed:int=0):
+    """
+    Mean fraction of the exact top-k (query item excluded) that the ANN search
+    returns, over n_queries random articles.
+    """
+    rng = np.random.default_rng(seed)
+    queries = rng.choice(len(index), size=min(n_queries, len(index)), replace=False)
+    hits = 0
+    for i in queries:
+        exact, _ = exact_search(index.vectors, index.vectors[i], k=k, exclude=[i], normalized=True)
+        approx, _ = index.search(index.vectors[i], k=k, n_probe=n_probe, exclude=[i])
+        hits += np.intersect1d(exact, approx).shape[0]
+    return hits / (len(queries) * k)
+
+
+IVF_FILES = ("vectors", "centroids", "list_ptr", "list_ids")
+
+
+def save_ivf(index:IVFIndex, path:str):
+    os.makedirs(path, exist_ok=True)
+    for name in IVF_FILES:
+        np.save(os.path.join(path, f"{name}.npy"), np.asarray(getattr(index, name)))
+    with open(os.path.join(path, "meta.json"), "w") as f:
+        json.dump({"n_probe": index.n_probe}, f)
+
+
+def load_ivf(path:str, mmap_mode=None, n_probe:int=None):
+    # n_probe overrides the one saved with the index
+    with open(os.path.join(path, "meta.json")) as f:
+        meta = json.load(f)
+    arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode) for name in IVF_FILES}
+    return IVFIndex(n_probe=n_probe or meta["n_probe"], **arrays)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the IVF index over article embeddings")
+    parser.add_argument("embeddings", help="directory written by embeddings.py / build_index.py (vectors.npy)")
+    parser.add_argument("output", help="directory to write the index to, e.g. data/ivf")
+    parser.add_argument("--n-lists", type=int, default=None, help="inverted lists (default: sqrt of the corpus size)")
+    parser.add_argument("--n-probe", type=int, default=8, help="lists scanned per query; CBRS_IVF_N_PROBE overrides it at load")
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    index = IVFIndex.build(np.load(os.path.join(args.embeddings, "vectors.npy"), mmap_mode="r"), n_lists=args.n_lists, n_probe=args.n_probe)
+    save_ivf(index, args.output)
+    print(f"{len(index)} articles in {index.centroids.shape[0]} lists, recall@{args.k} at n_probe={args.n_probe}: "
+          f"{recall_at_k(index, k=args.k):.3f}")
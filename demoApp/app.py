@@ -4,75 +4,70 @@ import pandas as pd
 import plotly.express as px
 import requests
 import io
+import os
 
 
 from utils import get_recommendation_list, get_personalized_recommendations
+from cache import ResultCache
+from columnar import with_article_details
+from loader import load_artifacts
+import instrument
 
 pd.options.plotting.backend = "plotly"
+# frames derived from the cached ones never write into them (always the case from pandas 3)
+if int(pd.__version__.split(".")[0]) == 2:
+    pd.options.mode.copy_on_write = True
 
 from annotated_text import annotated_text
 
-@st.cache(allow_output_mutation=True)
-def load_data():
-    # articles
-    ARTICLES_URL = "https://drive.google.com/file/d/17pI0-_Zkmh68FrSvvc0dasznEbIj8YKu/view?usp=sharing"
-    ARTICLES_FILE_ID=ARTICLES_URL.split('/')[-2]
-    ARTICLES_DWN_LINK='https://drive.google.com/uc?id=' + ARTICLES_FILE_ID
-    articles = pd.read_csv(ARTICLES_DWN_LINK)
-
-    # similarity matrix
-    SIMILARITY_MATRIX_URL = "https://drive.google.com/file/d/1rv9wri2O517dJ-H3zofI1_mabPZjMs4w/view?usp=sharing"
-    SIMILARITY_MATRIX_FILE_ID=SIMILARITY_MATRIX_URL.split('/')[-2]
-    SIMILARITY_MATRIX_DWN_LINK='https://drive.google.com/uc?id=' + SIMILARITY_MATRIX_FILE_ID    
-    sim_matrix = np.load(SIMILARITY_MATRIX_DWN_LINK)
-    
-    # indices
-    INDICES_URL = "https://drive.google.com/file/d/1hgbwX3BBZ9BNhKe_IaHhDqb91uOSvGlh/view?usp=sharing"
-    INDICES_FILE_ID=INDICES_URL.split('/')[-2]
-    INDICES_DWN_LINK='https://drive.google.com/uc?id=' + INDICES_FILE_ID
-    indices = pd.read_csv(INDICES_DWN_LINK, header=None, index_col=0)
-
-
-    # interactions
-    INTERACTIONS_URL = "https://drive.google.com/file/d/1KpKWLM8S5lqPBaGpIg8LPMHVIo4wX4-r/view?usp=sharing"
-    INTERACTIONS_FILE_ID=INTERACTIONS_URL.split('/')[-2]
-    INTERACTIONS_DWN_LINK='https://drive.google.com/uc?id=' + INTERACTIONS_FILE_ID
-    interactions = pd.read_csv(INTERACTIONS_DWN_LINK)
+RESULT_CACHE_SIZE = int(os.environ.get("CBRS_RESULT_CACHE_SIZE", "1024"))
 
+# one copy of the artifacts per process, shared by every session and never
+# hashed or copied per run; "Reload data" in the sidebar calls load_data.clear()
+@st.cache_resource(show_spinner="Loading articles and similarity artifacts...")
+def load_data():
+    return load_artifacts()
 
-    return articles, sim_matrix, indices, interactions
+@st.cache_resource
+def get_result_cache():
+    # one LRU per process, shared by every session; see get_recommendations
+    return ResultCache(maxsize=RESULT_CACHE_SIZE)
 
-def show_data_exploration(articles, interactions):
+def show_data_exploration(articles, aggregates):
 
     st.markdown("### Data exploration")
 
-    shape = articles.shape
     st.write("Preview of the dataset")
-    st.write(f"Number of articles: {shape[0]}\n")
-    st.write(f"Number of attributes: {shape[1]}\n")
+    st.write(f"Number of articles: {aggregates['n_articles']}\n")
+    st.write(f"Number of attributes: {aggregates['n_attributes']}\n")
 
     attr_options = st.multiselect(
         label='Select columns to view',
         options=articles.columns.to_list(),
         default = ["title", "category_name", "group_name", "categories"]
     )
-    df = articles[attr_options]
 
-    st.dataframe(df)
+    # only the visible page is sent to the browser
+    cols = st.columns(2)
+    page_size = cols[0].selectbox("Rows per page", [25, 50, 100, 500], index=1)
+    n_pages = max(1, -(-len(articles) // page_size))
+    page = cols[1].number_input(f"Page (of {n_pages})", min_value=1, max_value=n_pages, value=1, step=1)
+    start = (page - 1) * page_size
+    df = articles.iloc[start:start + page_size][attr_options]
 
-    count = articles.categories.value_counts()
+    st.dataframe(df)
 
     ## plotting
     k = 20
 
-    fig = articles.categories.value_counts()[:k].sort_values().plot(kind = 'barh')
+    fig = aggregates["category_counts"][:k].sort_values().plot(kind = 'barh')
     fig.layout.bargap = 0
     fig.update_layout(
         title=f"Number of articles per category (Top {k})"
     )
     st.plotly_chart(fig)
     
-    counts = articles.group_name.value_counts()
+    counts = aggregates["group_counts"]
 
 
     fig = px.pie(
@@ -87,12 +82,12 @@ def show_data_exploration(articles, interactions):
     )
     
     st.plotly_chart(fig)
-    interactions_count = interactions.eventType.value_counts()
+    interactions_count = aggregates["event_counts"]
 
     fig = px.pie(
-        interactions, 
-        interactions_count.index,
-        interactions_count.values, 
+        interactions_count, 
+        names=interactions_count.index,
+        values=interactions_count.values, 
         title='Distribution of Interaction Type',
         color_discrete_sequence=px.colors.sequential.RdBu
 
@@ -102,7 +97,7 @@ def show_data_exploration(articles, interactions):
 
 
 
-def main(articles, sim_matrix, indices, interactions, personalized):
+def main(articles, sim_matrix, indices, interactions, search_indexes, personalized):
     ### Main 
 
     st.markdown(
@@ -119,7 +114,8 @@ def main(articles, sim_matrix, indices, interactions, personalized):
             personalized=personalized,
             articles=articles, 
             sim_matrix=sim_matrix, 
-            indices=indices
+            indices=indices,
+            search_indexes=search_indexes
         )
 
         if query_title is not None:
@@ -139,9 +135,12 @@ def get_recommendations(
     articles, 
     indices, 
     sim_matrix, 
+    search_indexes:dict=None,
     personalized:bool=False
     ):
 
+    search_indexes = search_indexes or {}
+
     query_title, u_id = None, None
 
     if personalized:
@@ -151,8 +150,12 @@ def get_recommendations(
             articles=articles, 
             interactions = interactions, 
             eventType="LIKE",
+            mode="profile",
             similarity_matrix=sim_matrix,
-            indices=indices
+            indices=indices,
+            title_index=search_indexes.get("title"),
+            interaction_index=search_indexes.get("interactions"),
+            article_ids=search_indexes.get("article_ids")
         )
         st.sidebar.markdown("### User ID :")
         st.sidebar.write(str(u_id))
@@ -160,13 +163,31 @@ def get_recommendations(
         st.sidebar.markdown("### Query title:")
         st.sidebar.write(query_title)
     else:
+        # widget clicks rerun the script with the same query: serve those from the cache
+        cache = get_result_cache()
+        cache.bind(search_indexes.get("version"))
         
         recommendations = get_recommendation_list(
             similarity_matrix=sim_matrix, 
             indices=indices, 
             title_or_keyword=search_key, 
-            df=articles
+            df=articles,
+            keyword_index=search_indexes.get("keyword"),
+            title_index=search_indexes.get("title"),
+            fuzzy_index=search_indexes.get("fuzzy"),
+            cache=cache
         )
+        resolved = recommendations.attrs.get("query", {})
+        match_score = resolved.get("match_score")
+        if match_score is not None and match_score < 1.0:
+            st.sidebar.markdown("### Closest title:")
+            st.sidebar.write(resolved["seed_title"])
+            st.sidebar.caption(f"{100*match_score:.0f}% similar to your query")
+        stats = cache.stats()
+        st.sidebar.caption(f"Result cache: {stats['hits']} hits / {stats['misses']} misses ({stats['size']} entries)")
+
+    # abstracts and authors for the k displayed rows only, when loaded from columnar storage
+    recommendations = with_article_details(recommendations, search_indexes.get("articles_path"))
 
     # st.write(recommendations.shape)
     # with st.container():
@@ -263,7 +284,11 @@ if __name__ =="__main__":
         page_title="Scientific paper Recommender System",
         page_icon=":book",
     )
-    articles, sim_matrix, indices, interactions = load_data()
+    if st.sidebar.button("Reload data"):
+        # next load_data() call re-reads the artifacts; results cached against
+        # the old ones are dropped through the new version stamp
+        load_data.clear()
+    articles, sim_matrix, indices, interactions, search_indexes = load_data()
 
     st.title(" 04-800 Introduction to Recommender Systems (RS)")
 
@@ -276,10 +301,21 @@ if __name__ =="__main__":
     selected_page = st.sidebar.radio("Options", options)
 
     personalized = st.sidebar.checkbox(label="Personalized")
+    # display only: recording is process-wide and set once from CBRS_INSTRUMENT,
+    # since every session shares this process
+    show_timings = st.sidebar.checkbox(label="Stage timings", value=instrument.ENABLED)
 
     if selected_page == "Explore dataset":
-        show_data_exploration(articles, interactions)
+        show_data_exploration(articles, search_indexes["aggregates"])
     else:
-        main(articles, sim_matrix, indices, interactions, personalized)
+        main(articles, sim_matrix, indices, interactions, search_indexes, personalized)
+
+    if show_timings:
+        st.sidebar.markdown("### Stage timings")
+        if not instrument.ENABLED:
+            st.sidebar.caption("Recording is off; start the app with CBRS_INSTRUMENT=1.")
+        st.sidebar.text(instrument.dump_text())
+        if st.sidebar.button("Reset timings"):
+            instrument.reset()
     st.sidebar.image("cmu_africa.jpg", use_column_width=True)
     st.sidebar.markdown("By Cedric Manouan @CMU-Africa, Fall 202")
@@ -0,0 +1,217 @@
+"""
+Artifact manager: fetches the data files the app needs concurrently into a
+content-addressed local cache, verified by SHA-256.
+
+    cache_dir/
+        objects/<sha256><ext>   one file per distinct content
+        manifest.json           artifact name -> {"sha256", "size"}
+
+A warm cache is served without touching the network. Each cached object is
+re-hashed once per process before it is first served, and a pinned
+ArtifactSpec.sha256 is checked on both downloads and cache hits. Where an
+artifact comes from is pluggable: Google Drive (the default), any HTTP file
+server, or a local directory, e.g. for tests:
+
+    manager = ArtifactManager("data/cache", ARTIFACTS, source=make_source("tests/fixtures"))
+    paths = manager.fetch(["articles", "indices"])
+"""
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+CHUNK_SIZE = 1 << 20
+
+# cached objects whose content hash was checked in this process
+_verified = set()
+_verified_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class ArtifactSpec:
+    filename: str
+    # Google Drive share link; other sources look the file up by filename
+    drive_url: str = None
+    # expected content hash; when None, the first verified download pins it in the manifest
+    sha256: str = None
+
+
+class ChecksumError(Exception):
+    pass
+
+
+class DriveSource:
+    def __init__(self, timeout:float=60):
+        self.timeout = timeout
+
+    def open(self, spec:ArtifactSpec):
+        import requests
+        file_id = spec.drive_url.split('/')[-2]
+        # confirm=t skips the "can't scan for viruses" page Drive serves for large files
+        url = f"https://drive.google.com/uc?export=download&id={file_id}&confirm=t"
+        response = requests.get(url, stream=True, timeout=self.timeout)
+        response.raise_for_status()
+        return response.iter_content(chunk_size=CHUNK_SIZE)
+
+
+class HTTPSource:
+    def __init__(self, base_url:str, timeout:float=60):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def open(self, spec:ArtifactSpec):
+        import requests
+        response = requests.get(f"{self.base_url}/{spec.filename}", stream=True, timeout=self.timeout)
+        response.raise_for_status()
+        return response.iter_content(chunk_size=CHUNK_SIZE)
+
+
+class LocalDirSource:
+    def __init__(self, directory:str):
+        self.directory = directory
+
+    def open(self, spec:ArtifactSpec):
+        path = os.path.join(self.directory, spec.filename)
+        if not os.path.exists(path):
+            raise FileNotFoundError(path)
+        return self._chunks(path)
+
+    @staticmethod
+    def _chunks(path):
+        with open(path, "rb") as f:
+            while True:
+                chunk = f.read(CHUNK_SIZE)
+                if not chunk:
+                    return
+                yield chunk
+
+
+def make_source(location:str=None):
+    # None -> Google Drive, http(s):// -> file server, anything else -> local directory
+    if location is None:
+        return DriveSource()
+    if location.startswith(("http://", "https://")):
+        return HTTPSource(location)
+    return LocalDirSource(location)
+
+
+def sha256_file(path:str):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ArtifactManager:
+    def __init__(self, cache_dir:str, artifacts:dict, source=None, retries:int=3, backoff:float=1.0, max_workers:int=4, verify_warm:bool=True):
+        self.cache_dir = cache_dir
+        self.artifacts = artifacts
+        self.source = source if source is not None else DriveSource()
+        self.retries = retries
+        self.backoff = backoff
+        self.max_workers = max_workers
+        # re-hash every cached object once per process before serving it; when off,
+        # a warm cache is only checked against the recorded size
+        self.verify_warm = verify_warm
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(cache_dir, "objects"), exist_ok=True)
+        os.makedirs(os.path.join(cache_dir, "tmp"), exist_ok=True)
+
+    @property
+    def manifest_path(self):
+        return os.path.join(self.cache_dir, "manifest.json")
+
+    def _read_manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return {}
+        with open(self.manifest_path) as f:
+            return json.load(f)
+
+    def _record(self, name:str, sha256:str, size:int):
+        with self._lock:
+            manifest = self._read_manifest()
+            manifest[name] = {"sha256": sha256, "size": size}
+            tmp_path = f"{self.manifest_path}.{os.getpid()}.{threading.get_ident()}"
+            with open(tmp_path, "w") as f:
+                json.dump(manifest, f, indent=2)
+            os.replace(tmp_path, self.manifest_path)
+
+    def _object_path(self, name:str, sha256:str):
+        ext = os.path.splitext(self.artifacts[name].filename)[1]
+        return os.path.join(self.cache_dir, "objects", sha256 + ext)
+
+    def cached_path(self, name:str):
+        """Path of a verified cached copy of `name`, or None when it must be fetched."""
+        spec = self.artifacts[name]
+        entry = self._read_manifest().get(name)
+        if entry is None or (spec.sha256 is not None and entry["sha256"] != spec.sha256):
+            return None
+        path = self._object_path(name, entry["sha256"])
+        if not os.path.exists(path) or os.path.getsize(path) != entry["size"]:
+            return None
+        if self.verify_warm and path not in _verified:
+            if sha256_file(path) != entry["sha256"]:
+                return None
+            with _verified_lock:
+                _verified.add(path)
+        return path
+
+    def _download(self, name:str):
+        spec = self.artifacts[name]
+        tmp_path = os.path.join(self.cache_dir, "tmp", f"{name}.{os.getpid()}.{threading.get_ident()}")
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            with open(tmp_path, "wb") as f:
+                for chunk in self.source.open(spec):
+                    f.write(chunk)
+                    digest.update(chunk)
+                    size += len(chunk)
+            sha256 = digest.hexdigest()
+            if spec.sha256 is not None and sha256 != spec.sha256:
+                raise ChecksumError(f"{name}: expected sha256 {spec.sha256}, got {sha256}")
+            path = self._object_path(name, sha256)
+            os.replace(tmp_path, path)
+            with _verified_lock:
+                _verified.add(path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        self._record(name, sha256, size)
+        return path
+
+    def _fetch_one(self, name:str):
+        path = self.cached_path(name)
+        if path is not None:
+            return path
+        for attempt in range(self.retries):
+            try:
+                return self._download(name)
+            except (ChecksumError, FileNotFoundError):
+                # wrong or missing content at the source: retrying cannot fix it
+                raise
+            except Exception:
+                if attempt == self.retries - 1:
+                    raise
+                time.sleep(self.backoff * 2 ** attempt)
+
+    def fetch(self, names=None):
+        """
+        Local paths of the named artifacts (all by default). Cached copies are
+        verified and missing ones downloaded concurrently.
+        """
+        names = list(self.artifacts) if names is None else list(names)
+        if not names:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(names))) as pool:
+            return dict(zip(names, pool.map(self._fetch_one, names)))
+
+    def clear(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        os.makedirs(os.path.join(self.cache_dir, "objects"), exist_ok=True)
+        os.makedirs(os.path.join(self.cache_dir, "tmp"), exist_ok=True)
@@ -0,0 +1,74 @@
+"""
+Import time and peak RSS of a fresh worker, before and after lazy spaCy loading.
+
+"before" replays what utils.py used to do at import time (import spaCy and
+load en_core_web_sm); "after" imports utils as it is now, then tokenizes one
+query in fast mode, which uses the stop words frozen in search.py and never
+imports spaCy. Each case runs in its own interpreter.
+
+    python benchmarks/bench_import.py --repeat 3
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CASES = {
+    "before": "import pandas, spacy, en_core_web_sm; from spacy import displacy; spacy.load('en_core_web_sm')",
+    # the same without the model, for machines where en_core_web_sm is not installed
+    "before (spaCy import only)": "import pandas, spacy; from spacy import displacy",
+    "after (import)": "import utils",
+    "after (first fast query)": "import utils; from search import tokenize_query; tokenize_query('quantum computing for the masses')",
+}
+
+PROBE = """
+import resource, time
+start = time.perf_counter()
+{stmt}
+elapsed = time.perf_counter() - start
+print(elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+
+def measure(stmt):
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE.format(stmt=stmt)],
+        cwd=APP_DIR, capture_output=True, text=True, check=True,
+    ).stdout.split()
+    # ru_maxrss is in KiB on Linux
+    return float(out[0]), int(out[1]) / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    results = {}
+    for name, stmt in CASES.items():
+        try:
+            runs = [measure(stmt) for _ in range(args.repeat)]
+        except subprocess.CalledProcessError as e:
+            results[name] = {"error": e.stderr.strip().splitlines()[-1]}
+            continue
+        results[name] = {
+            "seconds": min(r[0] for r in runs),
+            "max_rss_mb": max(r[1] for r in runs),
+        }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for name, r in results.items():
+        if "error" in r:
+            print(f"{name:>26}: {r['error']}")
+        else:
+            print(f"{name:>26}: {r['seconds']:.3f} s, {r['max_rss_mb']:.0f} MB peak RSS")
+
+
+if __name__ == "__main__":
+    main()
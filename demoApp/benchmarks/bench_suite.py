@@ -0,0 +1,155 @@
+"""
+Benchmark suite for the recommendation utilities on synthetic corpora.
+
+For every scale, builds a synthetic corpus (see synthetic.py) and the load-time
+indexes, then times each public function of utils.py over random queries,
+reporting p50 / p95 latency and the peak memory allocated by one call
+(tracemalloc). Results are written as JSON so runs can be compared between
+releases:
+
+    python benchmarks/bench_suite.py --scales 1000 10000 100000 1000000 --output bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import utils
+from categories import CategoryLookup, map_categories
+from interactions import InteractionIndex, build_article_id_map
+from search import BM25Index, KeywordIndex, TitleIndex, TrigramIndex
+from synthetic import make_corpus
+
+
+def measure(fn, repeat:int):
+    """p50 / p95 latency over `repeat` calls of fn(rep), then peak memory of one traced call."""
+    timings = []
+    for rep in range(repeat):
+        start = time.perf_counter()
+        fn(rep)
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    fn(0)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    timings = np.array(timings) * 1e3
+    return {
+        "calls": repeat,
+        "p50_ms": float(np.percentile(timings, 50)),
+        "p95_ms": float(np.percentile(timings, 95)),
+        "peak_mem_mb": peak / 2**20,
+    }
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - start) * 1e3
+
+
+def bench_scale(n:int, repeat:int, dense_max:int, seed:int=0):
+    rng = np.random.default_rng(seed)
+    corpus, build_ms = timed(lambda: make_corpus(n, dense_max=dense_max, seed=seed))
+    articles, indices, interactions = corpus["articles"], corpus["indices"], corpus["interactions"]
+    sim, categories = corpus["similarity"], corpus["categories"]
+
+    # load-time structures, timed once
+    setup = {"corpus_ms": build_ms}
+    keyword_index, setup["keyword_index_ms"] = timed(lambda: KeywordIndex.from_titles(articles.title.values))
+    bm25_index, setup["bm25_index_ms"] = timed(lambda: BM25Index.from_texts(articles.title.values, articles.abstract.values))
+    title_index, setup["title_index_ms"] = timed(lambda: TitleIndex.from_indices(indices))
+    fuzzy_index, setup["trigram_index_ms"] = timed(lambda: TrigramIndex.from_title_index(title_index))
+    interaction_index, setup["interaction_index_ms"] = timed(lambda: InteractionIndex.from_interactions(interactions))
+    article_ids, setup["article_id_map_ms"] = timed(lambda: build_article_id_map(articles))
+    category_lookup, setup["category_lookup_ms"] = timed(lambda: CategoryLookup.from_frame(categories))
+
+    titles = articles.title.values[rng.integers(0, n, size=repeat)]
+    # one character of every title replaced: resolved by the trigram index
+    typos = [t[:len(t) // 2] + "q" + t[len(t) // 2 + 1:] for t in titles]
+    keywords = [" ".join(t.split()[:2]) for t in articles.title.values[rng.integers(0, n, size=repeat)]]
+    users = interactions.personId.values[rng.integers(0, len(interactions), size=repeat)]
+    category_ids = [c.split(",") for c in articles.categories.values[rng.integers(0, n, size=repeat)]]
+    batch = articles.title.values[rng.integers(0, n, size=256)]
+
+    cases = {
+        "get_paper_by_keywords": lambda r: utils.get_paper_by_keywords(keywords[r], articles, keyword_index=keyword_index),
+        "get_paper_by_title": lambda r: utils.get_paper_by_title([titles[r]], indices, title_index=title_index),
+        "get_recommendation_list[title]": lambda r: utils.get_recommendation_list(
+            sim, indices, titles[r], articles, keyword_index=keyword_index, title_index=title_index),
+        "get_recommendation_list[typo]": lambda r: utils.get_recommendation_list(
+            sim, indices, typos[r], articles, keyword_index=keyword_index, title_index=title_index, fuzzy_index=fuzzy_index),
+        "get_recommendation_list[keywords]": lambda r: utils.get_recommendation_list(
+            sim, indices, keywords[r], articles, keyword_index=keyword_index, title_index=title_index),
+        "get_recommendation_list[keywords, bm25]": lambda r: utils.get_recommendation_list(
+            sim, indices, keywords[r], articles, keyword_index=bm25_index, title_index=title_index),
+        "get_recommendation_lists[256]": lambda r: utils.get_recommendation_lists(
+            sim, indices, batch, articles, title_index=title_index),
+        "get_personalized_recommendations[single]": lambda r: utils.get_personalized_recommendations(
+            users[r], interactions, articles, sim, indices, title_index=title_index,
+            interaction_index=interaction_index, article_ids=article_ids),
+        "get_personalized_recommendations[profile]": lambda r: utils.get_personalized_recommendations(
+            users[r], interactions, articles, sim, indices, interaction_index=interaction_index,
+            article_ids=article_ids, mode="profile"),
+        "get_category_name": lambda r: utils.get_category_name(category_lookup, category_ids[r]),
+        "get_group_name": lambda r: utils.get_group_name(category_lookup, category_ids[r]),
+        "get_category_description": lambda r: utils.get_category_description(category_lookup, category_ids[r]),
+        "map_categories[all articles]": lambda r: map_categories(articles, category_lookup),
+    }
+
+    results = []
+    for name, fn in cases.items():
+        # whole-table operations are timed fewer times
+        reps = max(3, repeat // 20) if "all articles" in name or "[256]" in name else repeat
+        results.append({"scale": n, "function": name, **measure(fn, reps)})
+    return {
+        "scale": n,
+        "similarity": type(sim).__name__,
+        "setup_ms": setup,
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", type=int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=100, help="calls per function and scale")
+    parser.add_argument("--dense-max", type=int, default=10_000, help="largest scale that gets a dense similarity matrix")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write JSON here instead of stdout")
+    args = parser.parse_args()
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "machine": platform.machine(),
+            "repeat": args.repeat,
+        },
+        "scales": [],
+    }
+    for n in args.scales:
+        print(f"benchmarking N={n}", file=sys.stderr)
+        report["scales"].append(bench_scale(n, args.repeat, args.dense_max, seed=args.seed))
+
+    out = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(out)
+    else:
+        print(out)
+
+
+if __name__ == "__main__":
+    main()
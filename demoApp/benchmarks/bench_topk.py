@@ -0,0 +1,59 @@
+"""
+Latency of the top-k step of get_recommendation_list against corpus size.
+
+Compares the former enumerate + sorted(key=lambda) approach with utils.top_k
+(np.argpartition + sort of the k winners) on one random similarity row.
+
+    python benchmarks/bench_topk.py --sizes 1000 10000 100000 1000000 --k 10
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils import top_k
+
+
+def legacy_top_k(row, k, query_idx):
+    scores = enumerate(row)
+    scores = sorted(scores, key=lambda x: x[1], reverse=True)
+    scores = [s for s in scores if s[0] != query_idx][:k]
+    return [s[0] for s in scores], [s[1] for s in scores]
+
+
+def time_call(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return np.median(timings) * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000])
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    print(f"{'N':>10} {'sorted (ms)':>12} {'top_k (ms)':>12} {'speedup':>8}")
+    for n in args.sizes:
+        row = rng.random(n, dtype=np.float32)
+        query_idx = int(rng.integers(n))
+        row[query_idx] = 1.0
+
+        legacy_ms = time_call(lambda: legacy_top_k(row, args.k, query_idx), args.repeat)
+        fast_ms = time_call(lambda: top_k(row, k=args.k, exclude=[query_idx]), args.repeat)
+
+        assert list(top_k(row, k=args.k, exclude=[query_idx])[0]) == legacy_top_k(row, args.k, query_idx)[0]
+        print(f"{n:>10} {legacy_ms:>12.3f} {fast_ms:>12.3f} {legacy_ms / fast_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Load generator for the recommendation service (service.py).
+
+Opens --concurrency keep-alive connections and sends requests back to back for
+--duration seconds, drawing queries from the service's /sample endpoint (or a
+file with one query per line). Reports throughput, latency percentiles and
+errors as JSON:
+
+    python service.py --synthetic 100000 &
+    python benchmarks/loadgen.py --endpoint similar --concurrency 64 --duration 10
+"""
+import argparse
+import asyncio
+import json
+import platform
+import sys
+import time
+from urllib.parse import quote, urlsplit
+
+import numpy as np
+
+ENDPOINTS = {
+    "similar": "/similar?title={query}&k={k}",
+    "recommend": "/recommend?q={query}&k={k}",
+    "personalized": "/personalized?mode=profile&k={k}",
+}
+
+
+async def request(reader, writer, host:str, target:str):
+    writer.write(f"GET {target} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode("latin-1"))
+    await writer.drain()
+    head = await reader.readuntil(b"\r\n\r\n")
+    status_line, *header_lines = head.decode("latin-1").rstrip("\r\n").split("\r\n")
+    length = 0
+    for line in header_lines:
+        name, _, value = line.partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    body = await reader.readexactly(length)
+    return int(status_line.split(" ")[1]), body
+
+
+async def fetch_queries(host:str, port:int, n:int):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        status, body = await request(reader, writer, host, f"/sample?n={n}")
+    finally:
+        writer.close()
+    if status != 200:
+        raise RuntimeError(f"/sample returned {status}: {body[:200]!r}")
+    return json.loads(body)["titles"]
+
+
+async def client(host:str, port:int, template:str, queries:list, k:int, deadline:float, seed:int, latencies:list, errors:dict):
+    rng = np.random.default_rng(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.perf_counter() < deadline:
+            query = queries[rng.integers(len(queries))]
+            target = template.format(query=quote(query), k=k)
+            start = time.perf_counter()
+            status, _ = await request(reader, writer, host, target)
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors[status] = errors.get(status, 0) + 1
+    finally:
+        writer.close()
+
+
+async def run(args):
+    url = urlsplit(args.url)
+    host, port = url.hostname, url.port or 80
+    if args.queries:
+        with open(args.queries) as f:
+            queries = [line.strip() for line in f if line.strip()]
+    else:
+        queries = await fetch_queries(host, port, args.sample)
+
+    latencies, errors = [], {}
+    started = time.perf_counter()
+    deadline = started + args.duration
+    await asyncio.gather(*(
+        client(host, port, ENDPOINTS[args.endpoint], queries, args.k, deadline, args.seed + i, latencies, errors)
+        for i in range(args.concurrency)
+    ))
+    elapsed = time.perf_counter() - started
+
+    timings = np.array(latencies) * 1e3
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "url": args.url,
+            "endpoint": args.endpoint,
+            "concurrency": args.concurrency,
+            "k": args.k,
+        },
+        "requests": len(latencies),
+        "errors": {str(status): n for status, n in sorted(errors.items())},
+        "elapsed_s": elapsed,
+        "throughput_rps": len(latencies) / elapsed,
+        "p50_ms": float(np.percentile(timings, 50)) if len(timings) else 0.0,
+        "p95_ms": float(np.percentile(timings, 95)) if len(timings) else 0.0,
+        "p99_ms": float(np.percentile(timings, 99)) if len(timings) else 0.0,
+        "max_ms": float(timings.max()) if len(timings) else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--endpoint", choices=sorted(ENDPOINTS), default="similar")
+    parser.add_argument("--concurrency", type=int, default=32, help="open connections")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", help="file with one query per line (default: titles from /sample)")
+    parser.add_argument("--sample", type=int, default=1000, help="titles to draw from /sample")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write JSON here instead of stdout")
+    args = parser.parse_args()
+
+    print(f"loading {args.url}{ENDPOINTS[args.endpoint].split('?')[0]} for {args.duration}s", file=sys.stderr)
+    out = json.dumps(asyncio.run(run(args)), indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(out)
+    else:
+        print(out)
+
+
+if __name__ == "__main__":
+    main()
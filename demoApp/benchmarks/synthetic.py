@@ -0,0 +1,106 @@
+"""
+Synthetic corpus for benchmarking: articles, categories, interactions, the
+indices title map and a similarity artifact, shaped like the real data.
+
+The similarity artifact is a dense matrix (cosine of random low-rank vectors)
+up to dense_max articles, and a top-K NeighborTable with random neighbors
+above that, since a dense 1M x 1M matrix does not fit in memory.
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from neighbors import NeighborTable
+
+GROUPS = ["Computer Science", "Mathematics", "Physics", "Statistics", "Quantitative Biology", "Economics"]
+
+
+def make_vocabulary(size:int, rng):
+    letters = np.array(list("abcdefghijklmnopqrstuvwxyz"))
+    lengths = rng.integers(4, 11, size=size)
+    return np.array(["".join(rng.choice(letters, size=n)) for n in lengths])
+
+
+def make_categories(n_categories:int=150, seed:int=0):
+    rng = np.random.default_rng(seed)
+    groups = rng.choice(GROUPS, size=n_categories)
+    ids = [f"{g.split()[0][:4].lower()}.{i:03d}" for i, g in enumerate(groups)]
+    return pd.DataFrame({
+        "category_id": ids,
+        "category_name": [f"Category {i}" for i in range(n_categories)],
+        "group_name": groups,
+        "category_description": [f"Synthetic description of category {i}" for i in range(n_categories)],
+    })
+
+
+def make_articles(n:int, categories:pd.DataFrame, vocab_size:int=20_000, seed:int=0):
+    rng = np.random.default_rng(seed)
+    vocab = make_vocabulary(vocab_size, rng)
+    # Zipf-distributed word ids, like real titles
+    title_len = rng.integers(4, 13, size=n)
+    words = vocab[np.minimum(rng.zipf(1.3, size=title_len.sum()), vocab_size) - 1]
+    titles = [" ".join(t) for t in np.split(words, np.cumsum(title_len)[:-1])]
+
+    cat_ids = categories.category_id.values
+    n_cats = rng.integers(1, 4, size=n)
+    article_cats = [",".join(c) for c in np.split(rng.choice(cat_ids, size=n_cats.sum()), np.cumsum(n_cats)[:-1])]
+    first_cat = categories.set_index("category_id").loc[[c.split(",")[0] for c in article_cats]]
+
+    return pd.DataFrame({
+        "id": [f"syn.{i:07d}" for i in range(n)],
+        "title": titles,
+        "abstract": [f"Abstract of synthetic article {i}. " * 8 for i in range(n)],
+        "authors": [f"Author {i % 997}, Author {i % 991}" for i in range(n)],
+        "categories": article_cats,
+        "category_name": first_cat.category_name.values,
+        "group_name": first_cat.group_name.values,
+    })
+
+
+def make_indices(articles:pd.DataFrame):
+    # same layout as the indices CSV: lower-cased title index, row id in column 1
+    return pd.DataFrame({1: np.arange(len(articles))}, index=articles.title.str.lower().values)
+
+
+def make_interactions(articles:pd.DataFrame, n_users:int=None, per_article:int=5, seed:int=0):
+    rng = np.random.default_rng(seed)
+    n = len(articles) * per_article
+    n_users = n_users or max(10, len(articles) // 20)
+    return pd.DataFrame({
+        "personId": rng.integers(0, n_users, size=n),
+        "contentId": articles["id"].values[rng.integers(0, len(articles), size=n)],
+        "eventType": rng.choice([4, 3, 0, 2, 1], p=[0.6, 0.2, 0.1, 0.05, 0.05], size=n),
+        "timestamp": np.sort(rng.integers(1_600_000_000, 1_700_000_000, size=n)),
+    })
+
+
+def make_similarity(n:int, dense_max:int=10_000, k:int=50, dim:int=32, seed:int=0):
+    rng = np.random.default_rng(seed)
+    if n <= dense_max:
+        vectors = rng.random((n, dim), dtype=np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors @ vectors.T
+
+    # random neighbors with decreasing scores; only the structure matters for timing
+    k = min(k, n - 1)
+    indices = rng.integers(0, n, size=(n, k), dtype=np.int32)
+    indices[:, 0] = np.arange(n)
+    scores = np.sort(rng.random((n, k), dtype=np.float32), axis=1)[:, ::-1]
+    scores[:, 0] = 1.0
+    indptr = np.arange(0, (n + 1) * k, k, dtype=np.int64)
+    return NeighborTable(indptr, indices.ravel(), np.ascontiguousarray(scores).ravel())
+
+
+def make_corpus(n:int, dense_max:int=10_000, seed:int=0):
+    categories = make_categories(seed=seed)
+    articles = make_articles(n, categories, seed=seed)
+    return {
+        "articles": articles,
+        "categories": categories,
+        "indices": make_indices(articles),
+        "interactions": make_interactions(articles, seed=seed),
+        "similarity": make_similarity(n, dense_max=dense_max, seed=seed),
+    }
@@ -0,0 +1,121 @@
+"""
+Offline build of the similarity artifacts from the articles table.
+
+    python build_index.py preprocessed_articles.csv data/ --dim 128 --k 50 --workers 8
+
+1. vectorizes title + abstract into low-rank embeddings (embeddings.py) and
+   writes them to <out>/embeddings;
+2. computes cosine similarity in row blocks across a process pool. Each worker
+   memory-maps the vectors, scores its rows against the corpus one column
+   chunk at a time and keeps only a running top-K, so a worker holds at most
+   block_size x chunk_size scores whatever the corpus size;
+3. streams every block's top-K straight into <out>/neighbors/{indices,scores}.npy
+   (np.lib.format.open_memmap), so the parent never holds more than one block;
+4. writes the indices title map (<out>/indices.csv, lower-cased title -> row)
+   in the layout load_data reads.
+
+With <out> set to the app's data directory (CBRS_DATA_DIR), load_artifacts
+picks up <out>/indices.csv ahead of the cached "indices" artifact. The
+neighbor rows follow the input articles table, so serve that same table:
+keep it at <out>/preprocessed_articles.csv, or publish it and indices.csv
+together as the "articles" and "indices" artifacts (loader.ARTIFACTS).
+"""
+import argparse
+import itertools
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+
+from embeddings import build_embeddings, save_embeddings
+from neighbors import block_top_k
+
+_vectors = None
+
+
+def _init_worker(vectors_path:str):
+    # every worker maps the same file: the OS page cache holds one copy
+    global _vectors
+    _vectors = np.load(vectors_path, mmap_mode="r")
+
+
+def _block_neighbors(start:int, stop:int, k:int, chunk_size:int):
+    rows = np.asarray(_vectors[start:stop])
+    n = _vectors.shape[0]
+    best_cols = np.empty((rows.shape[0], 0), dtype=np.int64)
+    best_scores = np.empty((rows.shape[0], 0), dtype=np.float32)
+    for col in range(0, n, chunk_size):
+        chunk_scores = rows @ np.asarray(_vectors[col:col + chunk_size]).T
+        cols, scores = block_top_k(chunk_scores, min(k, chunk_scores.shape[1]))
+        merged_cols = np.concatenate([best_cols, cols + col], axis=1)
+        merged_scores = np.concatenate([best_scores, scores], axis=1)
+        order, best_scores = block_top_k(merged_scores, k)
+        best_cols = np.take_along_axis(merged_cols, order, axis=1)
+    return start, best_cols.astype(np.int32), best_scores.astype(np.float32)
+
+
+def build_neighbors_blocked(vectors_path:str, out_dir:str, k:int=50, block_size:int=512, chunk_size:int=65536, workers:int=None):
+    n = np.load(vectors_path, mmap_mode="r").shape[0]
+    k = min(k, n)
+    os.makedirs(out_dir, exist_ok=True)
+    indices = np.lib.format.open_memmap(os.path.join(out_dir, "indices.npy"), mode="w+", dtype=np.int32, shape=(n * k,))
+    scores = np.lib.format.open_memmap(os.path.join(out_dir, "scores.npy"), mode="w+", dtype=np.float32, shape=(n * k,))
+    np.save(os.path.join(out_dir, "indptr.npy"), np.arange(0, (n + 1) * k, k, dtype=np.int64))
+
+    # at most two blocks per worker are queued or finished-but-unwritten, and each
+    # future is dropped once its block is written, so the parent holds
+    # O(workers * block_size * k) results whatever n is
+    max_in_flight = 2 * (workers or os.cpu_count() or 1)
+    starts = iter(range(0, n, block_size))
+    pending = set()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(vectors_path,)) as pool:
+        while True:
+            for start in itertools.islice(starts, max_in_flight - len(pending)):
+                pending.add(pool.submit(_block_neighbors, start, min(start + block_size, n), k, chunk_size))
+            if not pending:
+                break
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                start, block_cols, block_scores = future.result()
+                indices[start * k:start * k + block_cols.size] = block_cols.ravel()
+                scores[start * k:start * k + block_scores.size] = block_scores.ravel()
+    indices.flush()
+    scores.flush()
+    return n, k
+
+
+def write_title_map(articles:pd.DataFrame, path:str):
+    # same layout as the original indices CSV: no header, title then row id
+    pd.Series(np.arange(len(articles)), index=articles.title.str.lower().values).to_csv(path, header=False)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("articles", help="articles CSV with title and abstract columns")
+    parser.add_argument("output", help="data directory to write embeddings/, neighbors/ and indices.csv to")
+    parser.add_argument("--dim", type=int, default=128, help="embedding dimensions")
+    parser.add_argument("--k", type=int, default=50, help="neighbors kept per article")
+    parser.add_argument("--block-size", type=int, default=512, help="rows per worker task")
+    parser.add_argument("--chunk-size", type=int, default=65536, help="columns scored at once inside a task")
+    parser.add_argument("--workers", type=int, default=None, help="process pool size (default: CPU count)")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    articles = pd.read_csv(args.articles, usecols=["title", "abstract"])
+    embeddings = build_embeddings(articles, dim=args.dim)
+    embeddings_dir = os.path.join(args.output, "embeddings")
+    save_embeddings(embeddings, embeddings_dir)
+    print(f"embedded {len(articles)} articles in {time.perf_counter() - started:.1f}s")
+
+    n, k = build_neighbors_blocked(
+        os.path.join(embeddings_dir, "vectors.npy"),
+        os.path.join(args.output, "neighbors"),
+        k=args.k,
+        block_size=args.block_size,
+        chunk_size=args.chunk_size,
+        workers=args.workers,
+    )
+    write_title_map(articles, os.path.join(args.output, "indices.csv"))
+    print(f"{n} articles x {k} neighbors written to {args.output} in {time.perf_counter() - started:.1f}s")
@@ -0,0 +1,64 @@
+"""
+Bounded LRU cache for recommendation results.
+
+Entries are keyed by the resolved query (article row, k, exclusions / filters)
+and stamped with the version of the similarity artifacts they were computed
+from: bind() the cache to the current version after every load, and a new
+version drops everything computed against the old artifacts.
+"""
+import threading
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class ResultCache:
+    def __init__(self, maxsize:int=1024, version=None):
+        self.maxsize = maxsize
+        self.version = version
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        # Streamlit serves sessions from several threads
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        with self._lock:
+            value = self._entries.get(key, _MISSING)
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, version=None):
+        with self._lock:
+            self._entries.clear()
+            self.version = version
+
+    def bind(self, version):
+        # no-op while the artifacts are unchanged, full invalidation otherwise
+        if version != self.version:
+            self.invalidate(version)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "version": self.version,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
@@ -0,0 +1,47 @@
+"""
+Category metadata (arXiv category id -> name, group, description), resolved
+through dicts built once from the categories table.
+"""
+import numpy as np
+import pandas as pd
+
+CATEGORY_FIELDS = ("category_name", "group_name", "category_description")
+
+
+class CategoryLookup:
+    def __init__(self, fields:dict):
+        # field name -> {category_id: value}
+        self.fields = fields
+
+    @classmethod
+    def from_frame(cls, df:pd.DataFrame, id_col:str="category_id"):
+        # first row wins for a duplicated category id, as the old mask lookups did
+        df = df.drop_duplicates(subset=id_col)
+        ids = df[id_col].values
+        return cls({field: dict(zip(ids, df[field].values)) for field in CATEGORY_FIELDS if field in df})
+
+    def resolve(self, field:str, category_ids, unique:bool=False):
+        # values of `field` for every known id, in order; unknown ids are skipped
+        mapping = self.fields[field]
+        values = [mapping[c] for c in category_ids if c in mapping]
+        return list(dict.fromkeys(values)) if unique else values
+
+
+def map_categories(articles:pd.DataFrame, lookup:CategoryLookup, column:str="categories"):
+    """
+    Resolve the comma-separated category ids of every article in one pass.
+
+    Returns a frame aligned with `articles` with a `category_name` column (one
+    name per known id, in order) and a `group_name` column (distinct groups).
+    Unknown ids are dropped; articles with no known id get "".
+    """
+    # the category strings repeat heavily, so resolve each distinct string once
+    # and broadcast the answers back with the factorized codes
+    codes, uniques = pd.factorize(articles[column].astype(object).fillna("").astype(str))
+    split = [[c.strip() for c in u.split(",")] for u in uniques]
+
+    result = pd.DataFrame(index=articles.index)
+    for field, unique in (("category_name", False), ("group_name", True)):
+        resolved = np.array([",".join(lookup.resolve(field, ids, unique=unique)) for ids in split] + [""], dtype=object)
+        result[field] = resolved[codes]
+    return result
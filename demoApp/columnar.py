@@ -0,0 +1,99 @@
+"""
+Columnar storage for the articles and interactions tables (Feather or Parquet
+via pyarrow), with typed, categorical columns and column projection.
+
+Pages load only the columns they need (ARTICLE_INDEX_COLUMNS for search and
+recommendation), and the wide text columns (abstract, authors) are fetched for
+just the result rows with fetch_rows. Feather files are written uncompressed
+so fetch_rows can memory-map them and touch only the requested rows.
+
+    python columnar.py preprocessed_articles.csv data/articles.feather --table articles
+    python columnar.py interactions.csv data/interactions.feather --table interactions
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+# what the search / recommendation pages need up front
+ARTICLE_INDEX_COLUMNS = ["id", "title", "categories", "category_name", "group_name"]
+# only read for the k rows that are displayed
+ARTICLE_DETAIL_COLUMNS = ["abstract", "authors"]
+INTERACTION_COLUMNS = ["personId", "contentId", "eventType", "timestamp"]
+
+CATEGORICAL_COLUMNS = {
+    "articles": ["categories", "category_name", "group_name"],
+    "interactions": ["contentId"],
+}
+
+
+def _is_feather(path:str):
+    return path.endswith((".feather", ".arrow"))
+
+
+def optimize_dtypes(df:pd.DataFrame, table:str):
+    df = df.copy()
+    for col in CATEGORICAL_COLUMNS.get(table, []):
+        if col in df:
+            df[col] = df[col].astype("category")
+    for col in df.select_dtypes("integer").columns:
+        df[col] = pd.to_numeric(df[col], downcast="integer")
+    return df
+
+
+def write_columnar(df:pd.DataFrame, path:str, table:str):
+    df = optimize_dtypes(df, table).reset_index(drop=True)
+    if _is_feather(path):
+        # uncompressed so readers can memory-map it
+        df.to_feather(path, compression="uncompressed")
+    else:
+        df.to_parquet(path, index=False)
+
+
+def read_columns(path:str, columns:list=None):
+    """Read only `columns` (all when None) of a columnar table."""
+    # columns the file does not have are skipped rather than raising
+    if _is_feather(path):
+        import pyarrow.feather as feather
+        table = feather.read_table(path, memory_map=True)
+        if columns is not None:
+            table = table.select([c for c in columns if c in table.column_names])
+        return table.to_pandas()
+    import pyarrow.parquet as pq
+    schema_columns = pq.read_schema(path).names
+    columns = None if columns is None else [c for c in columns if c in schema_columns]
+    return pd.read_parquet(path, columns=columns)
+
+
+def fetch_rows(path:str, rows, columns:list):
+    """
+    `columns` of the given row positions only, in the order of `rows`. Feather
+    files are memory-mapped, so only the pages holding those rows are read.
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    if _is_feather(path):
+        import pyarrow.feather as feather
+        table = feather.read_table(path, columns=columns, memory_map=True)
+        return table.take(rows).to_pandas().set_index(pd.Index(rows))
+    return read_columns(path, columns).iloc[rows].set_index(pd.Index(rows))
+
+
+def with_article_details(recommendations:pd.DataFrame, path:str, columns:list=ARTICLE_DETAIL_COLUMNS):
+    # fill in the detail columns of a result frame whose index holds article row positions
+    missing = [c for c in columns if c not in recommendations]
+    if not missing or path is None:
+        return recommendations
+    details = fetch_rows(path, recommendations.index.values, missing)
+    return recommendations.assign(**{c: details[c].values for c in missing})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert a CSV table to Feather or Parquet")
+    parser.add_argument("csv")
+    parser.add_argument("output", help="*.feather / *.arrow for Feather, anything else for Parquet")
+    parser.add_argument("--table", choices=sorted(CATEGORICAL_COLUMNS), required=True)
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.csv)
+    write_columnar(df, args.output, args.table)
+    print(f"{len(df)} rows, {df.memory_usage(deep=True).sum() / 1e6:.1f} MB in memory as CSV-typed frame")
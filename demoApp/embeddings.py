@@ -0,0 +1,112 @@
+"""
+Low-rank article embeddings: one d-dimensional vector per article instead of
+an N x N similarity matrix.
+
+Vectors are a TruncatedSVD of the TF-IDF of title + abstract, L2-normalized,
+so the cosine similarity row of article i is one matrix-vector product,
+vectors @ vectors[i], computed when the row is asked for. Storage is N x d, and
+a new article only needs its own vector. Build them offline with
+
+    python embeddings.py preprocessed_articles.csv embeddings/ --dim 128
+"""
+import argparse
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from ann import normalize_rows
+
+TEXT_COLUMNS = ("title", "abstract")
+
+
+def article_texts(articles:pd.DataFrame, columns=TEXT_COLUMNS):
+    text = articles[columns[0]].fillna("").astype(str)
+    for col in columns[1:]:
+        text = text + " " + articles[col].fillna("").astype(str)
+    return text.values
+
+
+class ArticleEmbeddings:
+    def __init__(self, vectors, model=None):
+        self.vectors = vectors
+        # fitted TF-IDF + SVD pipeline, needed to embed new articles
+        self.model = model
+
+    def __len__(self):
+        return self.vectors.shape[0]
+
+    @property
+    def shape(self):
+        return (len(self), len(self))
+
+    @property
+    def nbytes(self):
+        return self.vectors.nbytes
+
+    def __getitem__(self, rows):
+        # similarity row(s) on demand, against all N vectors
+        query = np.asarray(self.vectors[rows])
+        if query.ndim == 1:
+            return self.vectors @ query
+        return query @ self.vectors.T
+
+    def weighted_sum(self, rows, weights):
+        # sum_j w_j * (V @ v_j) == V @ (sum_j w_j * v_j): one product for a whole profile
+        profile = np.asarray(weights, dtype=np.float32) @ np.asarray(self.vectors[rows])
+        return self.vectors @ profile
+
+    def transform(self, texts):
+        if self.model is None:
+            raise ValueError("these embeddings were saved without their model; rebuild them to embed new articles")
+        return normalize_rows(self.model.transform(texts))
+
+    def add(self, vectors):
+        # append vectors for new articles; their row ids continue from len(self)
+        self.vectors = np.concatenate([np.asarray(self.vectors), normalize_rows(vectors)])
+        return self
+
+
+def build_embeddings(articles:pd.DataFrame, dim:int=128, columns=TEXT_COLUMNS, max_features:int=200_000, seed:int=0):
+    from sklearn.decomposition import TruncatedSVD
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.pipeline import make_pipeline
+
+    model = make_pipeline(
+        TfidfVectorizer(stop_words="english", sublinear_tf=True, max_features=max_features, dtype=np.float32),
+        TruncatedSVD(n_components=dim, random_state=seed),
+    )
+    vectors = model.fit_transform(article_texts(articles, columns))
+    return ArticleEmbeddings(normalize_rows(vectors), model)
+
+
+def save_embeddings(embeddings:ArticleEmbeddings, path:str):
+    os.makedirs(path, exist_ok=True)
+    np.save(os.path.join(path, "vectors.npy"), np.asarray(embeddings.vectors))
+    if embeddings.model is not None:
+        with open(os.path.join(path, "model.pkl"), "wb") as f:
+            pickle.dump(embeddings.model, f)
+
+
+def load_embeddings(path:str, mmap_mode=None, load_model:bool=False):
+    # the model is only needed to embed new articles, so it is not unpickled by default
+    vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode=mmap_mode)
+    model = None
+    model_path = os.path.join(path, "model.pkl")
+    if load_model and os.path.exists(model_path):
+        with open(model_path, "rb") as f:
+            model = pickle.load(f)
+    return ArticleEmbeddings(vectors, model)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build low-rank TF-IDF/SVD article embeddings")
+    parser.add_argument("articles", help="articles CSV with title and abstract columns")
+    parser.add_argument("output", help="directory to write vectors.npy and model.pkl to")
+    parser.add_argument("--dim", type=int, default=128)
+    args = parser.parse_args()
+
+    embeddings = build_embeddings(pd.read_csv(args.articles), dim=args.dim)
+    save_embeddings(embeddings, args.output)
+    print(f"{len(embeddings)} articles x {args.dim} dims: {embeddings.nbytes / 1e6:.1f} MB")
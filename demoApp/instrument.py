@@ -0,0 +1,134 @@
+"""
+Per-stage latency instrumentation for the recommendation path.
+
+    with stage("top_k"):
+        ...
+
+is a shared no-op context manager while instrumentation is disabled (the
+default; set CBRS_INSTRUMENT=1 or call enable()), so the cost on the hot path
+is one function call. When enabled, every stage feeds a histogram with
+log2-spaced microsecond buckets, which can be dumped as text or JSON.
+"""
+import json
+import math
+import os
+import threading
+import time
+
+ENABLED = os.environ.get("CBRS_INSTRUMENT", "0") == "1"
+
+_histograms = {}
+_lock = threading.Lock()
+
+
+class Histogram:
+    # bucket b counts durations in [2**(b-1), 2**b) microseconds; bucket 0 is < 1 us
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def add(self, seconds:float):
+        micros = seconds * 1e6
+        bucket = 0 if micros < 1 else int(math.log2(micros)) + 1
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+        self.count += 1
+        self.total += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+
+    def percentile(self, q:float):
+        # upper edge of the bucket holding the q-th percentile, in seconds
+        if self.count == 0:
+            return 0.0
+        rank = q / 100 * self.count
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return min(2 ** bucket / 1e6, self.max)
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count * 1e3 if self.count else 0.0,
+            "min_ms": self.min * 1e3 if self.count else 0.0,
+            "p50_ms": self.percentile(50) * 1e3,
+            "p95_ms": self.percentile(95) * 1e3,
+            "p99_ms": self.percentile(99) * 1e3,
+            "max_ms": self.max * 1e3,
+            "buckets_us": {str(2 ** b if b else 1): n for b, n in sorted(self.buckets.items())},
+        }
+
+
+class _NullStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name:str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+def stage(name:str):
+    if not ENABLED:
+        return _NULL_STAGE
+    return _Stage(name)
+
+
+def enable(flag:bool=True):
+    global ENABLED
+    ENABLED = flag
+
+
+def record(name:str, seconds:float):
+    with _lock:
+        hist = _histograms.get(name)
+        if hist is None:
+            hist = _histograms[name] = Histogram()
+        hist.add(seconds)
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+
+
+def snapshot():
+    with _lock:
+        return {name: hist.summary() for name, hist in sorted(_histograms.items())}
+
+
+def dump_json(**kwargs):
+    return json.dumps(snapshot(), **kwargs)
+
+
+def dump_text():
+    stats = snapshot()
+    if not stats:
+        return "no stages recorded"
+    width = max(len(name) for name in stats)
+    lines = [f"{'stage':<{width}} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9}"]
+    for name, s in stats.items():
+        lines.append(f"{name:<{width}} {s['count']:>7} {s['p50_ms']:>9.3f} {s['p95_ms']:>9.3f} {s['max_ms']:>9.3f}")
+    return "\n".join(lines)
@@ -0,0 +1,58 @@
+"""
+Precomputed lookups over the interactions and articles tables, so a
+personalized request costs O(user's history) instead of a full scan.
+"""
+import numpy as np
+import pandas as pd
+
+
+class InteractionIndex:
+    """
+    Interactions sorted by (user, event type), with the [start, end) offsets of
+    every user and every (user, event type) group into the sorted arrays.
+    `positions` maps sorted entries back to rows of the original frame.
+    """
+    def __init__(self, content_ids, positions, user_offsets:dict, group_offsets:dict):
+        self.content_ids = content_ids
+        self.positions = positions
+        self.user_offsets = user_offsets
+        self.group_offsets = group_offsets
+
+    @classmethod
+    def from_interactions(cls, interactions:pd.DataFrame, user_col:str="personId", event_col:str="eventType", content_col:str="contentId"):
+        users = interactions[user_col].values
+        events = interactions[event_col].values
+        order = np.lexsort((events, users))
+        users, events = users[order], events[order]
+
+        n = order.shape[0]
+        user_starts = np.flatnonzero(np.r_[True, users[1:] != users[:-1]]) if n else np.empty(0, dtype=np.intp)
+        group_starts = np.flatnonzero(np.r_[True, (users[1:] != users[:-1]) | (events[1:] != events[:-1])]) if n else np.empty(0, dtype=np.intp)
+
+        user_offsets = dict(zip(users[user_starts].tolist(), zip(user_starts.tolist(), np.r_[user_starts[1:], n].tolist())))
+        group_offsets = dict(zip(
+            zip(users[group_starts].tolist(), events[group_starts].tolist()),
+            zip(group_starts.tolist(), np.r_[group_starts[1:], n].tolist()),
+        ))
+        return cls(interactions[content_col].values[order], order, user_offsets, group_offsets)
+
+    def _span(self, user_id, event_type=None):
+        if event_type is None:
+            return self.user_offsets.get(user_id, (0, 0))
+        return self.group_offsets.get((user_id, event_type), (0, 0))
+
+    def history(self, user_id, event_type=None):
+        """contentIds the user interacted with, optionally for one event type only"""
+        start, end = self._span(user_id, event_type)
+        return self.content_ids[start:end]
+
+    def history_rows(self, user_id, event_type=None):
+        """row positions in the interactions frame, for reading other columns"""
+        start, end = self._span(user_id, event_type)
+        return self.positions[start:end]
+
+
+def build_article_id_map(articles:pd.DataFrame, id_col:str="id"):
+    # contentId -> row position in articles; the first row wins for duplicated ids
+    ids = articles[id_col].values
+    return dict(zip(ids[::-1].tolist(), range(len(ids) - 1, -1, -1)))
@@ -0,0 +1,192 @@
+"""
+Loads the recommendation artifacts and builds the lookup structures over them.
+
+Kept free of Streamlit so the app (app.py) and the headless service
+(service.py) load the data the same way.
+"""
+import os
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from artifacts import ArtifactManager, ArtifactSpec, make_source
+from columnar import ARTICLE_INDEX_COLUMNS, INTERACTION_COLUMNS, read_columns
+from interactions import InteractionIndex, build_article_id_map
+from search import FUZZY_MAX_CANDIDATES, KeywordIndex, TitleIndex, TrigramIndex, load_bm25_index
+from storage import open_similarity
+
+# local artifact cache; the similarity matrix is memory-mapped from here unless CBRS_MMAP=0
+DATA_DIR = os.environ.get("CBRS_DATA_DIR", "data")
+USE_MMAP = os.environ.get("CBRS_MMAP", "1") == "1"
+# postings one typo-tolerant title lookup may scan (search.TrigramIndex.search)
+FUZZY_MAX_CANDIDATES = int(os.environ.get("CBRS_FUZZY_MAX_CANDIDATES", FUZZY_MAX_CANDIDATES))
+
+# similarity backends and where their artifact lives under DATA_DIR; CBRS_SIMILARITY
+# picks one, otherwise the first compact artifact present is used, then the dense matrix
+SIMILARITY_ARTIFACTS = {
+    "neighbors": "neighbors",
+    "int8": "similarity_int8",
+    "float16": "similarity_float16",
+    "embeddings": "embeddings",
+    "ivf": "ivf",
+    "dense": "similarity_matrix.npy",
+}
+# clusters an IVF index scans per query (recall vs. latency); default: the one it was built with
+IVF_N_PROBE = int(os.environ.get("CBRS_IVF_N_PROBE", "0")) or None
+
+BM25_ARTIFACT = "bm25"
+
+def find_columnar(name:str):
+    # a Feather or Parquet copy of a table in DATA_DIR (see columnar.py), if there is one
+    for ext in (".feather", ".parquet"):
+        path = os.path.join(DATA_DIR, name + ext)
+        if os.path.exists(path):
+            return path
+    return None
+
+def select_similarity_backend():
+    backend = os.environ.get("CBRS_SIMILARITY")
+    if backend is not None:
+        if backend not in SIMILARITY_ARTIFACTS:
+            raise ValueError(f"CBRS_SIMILARITY must be one of {list(SIMILARITY_ARTIFACTS)}, got {backend!r}")
+        return backend
+    for backend, name in SIMILARITY_ARTIFACTS.items():
+        if backend != "dense" and os.path.isdir(os.path.join(DATA_DIR, name)):
+            return backend
+    return "dense"
+
+# remote artifacts, fetched concurrently into the checksum-verified cache under
+# DATA_DIR/cache (see artifacts.py); CBRS_ARTIFACT_SOURCE swaps Google Drive for an
+# http(s):// file server or a local directory holding files with these names
+# Set sha256= on a spec to pin its content; unpinned artifacts are pinned in the
+# cache manifest by their first download and re-hashed once per process.
+ARTIFACTS = {
+    "articles": ArtifactSpec(
+        "preprocessed_articles.csv",
+        drive_url="https://drive.google.com/file/d/17pI0-_Zkmh68FrSvvc0dasznEbIj8YKu/view?usp=sharing",
+    ),
+    "similarity_matrix": ArtifactSpec(
+        "similarity_matrix.npy",
+        drive_url="https://drive.google.com/file/d/1rv9wri2O517dJ-H3zofI1_mabPZjMs4w/view?usp=sharing",
+    ),
+    "indices": ArtifactSpec(
+        "indices.csv",
+        drive_url="https://drive.google.com/file/d/1hgbwX3BBZ9BNhKe_IaHhDqb91uOSvGlh/view?usp=sharing",
+    ),
+    "interactions": ArtifactSpec(
+        "interactions.csv",
+        drive_url="https://drive.google.com/file/d/1KpKWLM8S5lqPBaGpIg8LPMHVIo4wX4-r/view?usp=sharing",
+    ),
+}
+
+def find_local(names):
+    # tables kept in DATA_DIR under their artifact filename (written by update.py or
+    # build_index.py) take precedence over the fetched copies
+    paths = {name: os.path.join(DATA_DIR, ARTIFACTS[name].filename) for name in names}
+    return {name: path for name, path in paths.items() if os.path.exists(path)}
+
+def get_artifact_manager():
+    return ArtifactManager(
+        os.path.join(DATA_DIR, "cache"),
+        ARTIFACTS,
+        source=make_source(os.environ.get("CBRS_ARTIFACT_SOURCE")),
+    )
+
+def build_search_indexes(articles:pd.DataFrame, indices:pd.DataFrame, interactions:pd.DataFrame, articles_path:str=None, keyword_index=None,
+                         fuzzy_max_candidates:int=None):
+    # lookup structures, built once per process; keyword_index defaults to a title-only KeywordIndex
+    title_index = TitleIndex.from_indices(indices)
+    if keyword_index is None:
+        keyword_index = KeywordIndex.from_titles(articles.title.values)
+    return {
+        "keyword": keyword_index,
+        "title": title_index,
+        # typo-tolerant fallback when a query is not an exact title
+        "fuzzy": TrigramIndex.from_title_index(
+            title_index, max_candidates=FUZZY_MAX_CANDIDATES if fuzzy_max_candidates is None else fuzzy_max_candidates),
+        "interactions": InteractionIndex.from_interactions(interactions),
+        "article_ids": build_article_id_map(articles),
+        # stamps cached results with the artifacts they were computed from
+        "version": uuid.uuid4().hex,
+        "articles_path": articles_path,
+    }
+
+def compute_aggregates(articles:pd.DataFrame, interactions:pd.DataFrame):
+    # what the "Explore dataset" page shows, computed once per load instead of on every rerun
+    return {
+        "n_articles": len(articles),
+        "n_attributes": articles.shape[1],
+        "category_counts": articles.categories.value_counts(),
+        "group_counts": articles.group_name.value_counts(),
+        "event_counts": interactions.eventType.value_counts(),
+    }
+
+def make_read_only(*artifacts):
+    # artifacts are shared by every session / worker thread: an in-place write
+    # raises instead of silently changing other users' results
+    for artifact in artifacts:
+        arrays = [artifact] if isinstance(artifact, np.ndarray) else list(getattr(artifact, "__dict__", {}).values())
+        for array in arrays:
+            if isinstance(array, np.ndarray):
+                array.flags.writeable = False
+
+def load_artifacts():
+    """
+    Articles, similarity artifact, indices, interactions and the lookup structures
+    built over them, as (articles, sim_matrix, indices, interactions, search_indexes).
+    """
+    # with a columnar copy, only the columns search needs are loaded; abstracts and
+    # authors are read for the displayed rows only (columnar.with_article_details)
+    ARTICLES_PATH = find_columnar("articles")
+    INTERACTIONS_PATH = find_columnar("interactions")
+    backend = select_similarity_backend()
+
+    # only what is not available locally in another form is fetched
+    needed = ["indices"]
+    if ARTICLES_PATH is None:
+        needed.append("articles")
+    if INTERACTIONS_PATH is None:
+        needed.append("interactions")
+    if backend == "dense":
+        needed.append("similarity_matrix")
+    paths = find_local(needed)
+    paths.update(get_artifact_manager().fetch([name for name in needed if name not in paths]))
+
+    # articles
+    if ARTICLES_PATH is not None:
+        articles = read_columns(ARTICLES_PATH, ARTICLE_INDEX_COLUMNS)
+    else:
+        articles = pd.read_csv(paths["articles"])
+
+    # similarity matrix
+    if backend == "dense":
+        sim_matrix = open_similarity(paths["similarity_matrix"], mmap=USE_MMAP)
+    else:
+        sim_matrix = open_similarity(os.path.join(DATA_DIR, SIMILARITY_ARTIFACTS[backend]), mmap=USE_MMAP)
+        if backend == "ivf" and IVF_N_PROBE is not None:
+            sim_matrix.n_probe = IVF_N_PROBE
+
+    if len(sim_matrix) != len(articles):
+        raise ValueError(
+            f"similarity artifact has {len(sim_matrix)} rows but there are {len(articles)} articles; "
+            f"rebuild or update them together (build_index.py / update.py --data-dir {DATA_DIR})"
+        )
+
+    # indices
+    indices = pd.read_csv(paths["indices"], header=None, index_col=0)
+
+    # interactions
+    if INTERACTIONS_PATH is not None:
+        interactions = read_columns(INTERACTIONS_PATH, INTERACTION_COLUMNS)
+    else:
+        interactions = pd.read_csv(paths["interactions"])
+
+    # BM25 over titles and abstracts, when built offline (python search.py ... data/bm25)
+    bm25_path = os.path.join(DATA_DIR, BM25_ARTIFACT)
+    keyword_index = load_bm25_index(bm25_path, mmap_mode="r" if USE_MMAP else None) if os.path.isdir(bm25_path) else None
+
+    search_indexes = build_search_indexes(articles, indices, interactions, articles_path=ARTICLES_PATH, keyword_index=keyword_index)
+    make_read_only(sim_matrix, *search_indexes.values())
+    search_indexes["aggregates"] = compute_aggregates(articles, interactions)
+    return articles, sim_matrix, indices, interactions, search_indexes
@@ -0,0 +1,149 @@
+"""
+Sparse top-K neighbor table: a compact replacement for the dense N x N similarity matrix.
+
+Only the K best entries of every similarity row are kept, in CSR form:
+
+    indptr  (N + 1,)  int64    row i lives in [indptr[i], indptr[i + 1])
+    indices (nnz,)    int32    neighbor row ids, best first
+    scores  (nnz,)    float32  matching similarity scores
+
+so memory grows as N * K instead of N ** 2. Build it offline from an existing matrix with
+
+    python neighbors.py similarity_matrix.npy neighbors/ --k 50
+"""
+import argparse
+import os
+
+import numpy as np
+
+NEIGHBOR_FILES = ("indptr", "indices", "scores")
+
+
+class NeighborTable:
+    def __init__(self, indptr, indices, scores):
+        self.indptr = indptr
+        self.indices = indices
+        self.scores = scores
+
+    def __len__(self):
+        return self.indptr.shape[0] - 1
+
+    @property
+    def shape(self):
+        return (len(self), len(self))
+
+    @property
+    def nbytes(self):
+        return self.indptr.nbytes + self.indices.nbytes + self.scores.nbytes
+
+    def row(self, i:int):
+        start, end = self.indptr[i], self.indptr[i + 1]
+        return self.indices[start:end], self.scores[start:end]
+
+    def top_k(self, i:int, k:int=10, exclude=None):
+        # rows are stored best first, so top-k is a filter and a slice
+        cols, vals = self.row(i)
+        if exclude is not None:
+            keep = ~np.isin(cols, exclude)
+            cols, vals = cols[keep], vals[keep]
+        return cols[:k].astype(np.intp), vals[:k]
+
+    def top_k_block(self, rows, k:int=10, exclude_self:bool=True):
+        """
+        Top-k neighbors of many rows at once, as (len(rows), k) index and score
+        arrays padded with -1 / nan where a row has fewer than k neighbors.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        starts, ends = self.indptr[rows], self.indptr[rows + 1]
+        width = int((ends - starts).max()) if rows.size else 0
+        # gather every row into a padded (n, width) block in one fancy index
+        pos = starts[:, None] + np.arange(width)
+        valid = pos < ends[:, None]
+        pos = np.where(valid, pos, 0)
+        cols = np.where(valid, self.indices[pos], -1)
+        vals = np.where(valid, self.scores[pos], np.nan)
+        if exclude_self:
+            valid &= cols != rows[:, None]
+
+        # stored best first: compact the surviving entries to the left, keep k
+        order = np.argsort(~valid, axis=1, kind="stable")[:, :k]
+        keep = np.take_along_axis(valid, order, axis=1)
+        out_cols = np.where(keep, np.take_along_axis(cols, order, axis=1), -1)
+        out_vals = np.where(keep, np.take_along_axis(vals, order, axis=1), np.nan)
+        if out_cols.shape[1] < k:
+            pad = k - out_cols.shape[1]
+            out_cols = np.pad(out_cols, ((0, 0), (0, pad)), constant_values=-1)
+            out_vals = np.pad(out_vals, ((0, 0), (0, pad)), constant_values=np.nan)
+        return out_cols.astype(np.intp), out_vals
+
+    def weighted_sum(self, rows, weights):
+        # sum_j weights[j] * row(rows[j]) as a dense length-N score vector
+        rows = np.asarray(rows, dtype=np.int64)
+        starts, ends = self.indptr[rows], self.indptr[rows + 1]
+        lengths = ends - starts
+        pos = np.repeat(starts - np.r_[0, np.cumsum(lengths)[:-1]], lengths) + np.arange(lengths.sum())
+        return np.bincount(
+            self.indices[pos],
+            weights=self.scores[pos] * np.repeat(weights, lengths),
+            minlength=len(self),
+        )
+
+
+def build_neighbor_table(similarity_matrix, k:int=50, block_size:int=1024):
+    """
+    Keep the k best entries of every row of a dense similarity matrix.
+
+    Rows are processed in blocks so the input can be a memory-mapped .npy
+    larger than RAM; only one block is materialized at a time.
+    """
+    n = similarity_matrix.shape[0]
+    k = min(k, similarity_matrix.shape[1])
+    indices = np.empty((n, k), dtype=np.int32)
+    scores = np.empty((n, k), dtype=np.float32)
+
+    for start in range(0, n, block_size):
+        block = np.asarray(similarity_matrix[start:start + block_size])
+        block_idx, block_scores = block_top_k(block, k)
+        indices[start:start + block.shape[0]] = block_idx
+        scores[start:start + block.shape[0]] = block_scores
+
+    indptr = np.arange(0, (n + 1) * k, k, dtype=np.int64)
+    return NeighborTable(indptr, indices.ravel(), scores.ravel())
+
+
+def block_top_k(block, k:int):
+    # row-wise top-k of a 2-D score block, best first
+    if k < block.shape[1]:
+        part = np.argpartition(-block, k - 1, axis=1)[:, :k]
+    else:
+        part = np.broadcast_to(np.arange(block.shape[1]), block.shape).copy()
+    part.sort(axis=1)
+    part_scores = np.take_along_axis(block, part, axis=1)
+    order = np.argsort(-part_scores, axis=1, kind="stable")
+    return np.take_along_axis(part, order, axis=1), np.take_along_axis(part_scores, order, axis=1)
+
+
+def save_neighbor_table(table:NeighborTable, path:str):
+    os.makedirs(path, exist_ok=True)
+    for name in NEIGHBOR_FILES:
+        np.save(os.path.join(path, f"{name}.npy"), getattr(table, name))
+
+
+def load_neighbor_table(path:str, mmap_mode=None):
+    arrays = [np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode) for name in NEIGHBOR_FILES]
+    return NeighborTable(*arrays)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build a top-K neighbor table from a dense similarity matrix")
+    parser.add_argument("similarity_matrix", help="path to the dense .npy similarity matrix")
+    parser.add_argument("output", help="directory to write indptr.npy, indices.npy and scores.npy to")
+    parser.add_argument("--k", type=int, default=50, help="neighbors kept per article")
+    parser.add_argument("--block-size", type=int, default=1024)
+    args = parser.parse_args()
+
+    sim_matrix = np.load(args.similarity_matrix, mmap_mode="r")
+    table = build_neighbor_table(sim_matrix, k=args.k, block_size=args.block_size)
+    save_neighbor_table(table, args.output)
+    print(f"{len(table)} articles, {args.k} neighbors each: {table.nbytes / 1e6:.1f} MB "
+          f"(dense: {sim_matrix.nbytes / 1e6:.1f} MB)")
@@ -0,0 +1,141 @@
+"""
+Quantized storage for the dense similarity matrix.
+
+    float16  2 bytes / entry, rows dequantized by a cast
+    int8     1 byte / entry, with a per-row scale and zero point:
+             row ~= (q + 128) * scale + offset, i.e. 255 levels over [row min, row max]
+
+Ranking only needs the order of a row, and the int8 rounding error is at most
+scale / 2 (under 0.2 % of the row's score range), so the "% Match" shown in the
+app is unchanged to about one decimal. Convert an existing matrix with
+
+    python quantize.py similarity_matrix.npy similarity_int8/ --dtype int8
+"""
+import argparse
+import os
+
+import numpy as np
+
+QUANTIZED_DTYPES = ("float16", "int8")
+
+
+class QuantizedMatrix:
+    def __init__(self, data, scale=None, offset=None):
+        self.data = data
+        self.scale = scale
+        self.offset = offset
+
+    @property
+    def dtype(self):
+        return self.data.dtype
+
+    @property
+    def shape(self):
+        return self.data.shape
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in (self.data, self.scale, self.offset) if a is not None)
+
+    def __len__(self):
+        return self.data.shape[0]
+
+    def __getitem__(self, rows):
+        # dequantize one row (or a block of rows) to float32 on access
+        values = np.asarray(self.data[rows], dtype=np.float32)
+        if self.scale is None:
+            return values
+        scale = np.asarray(self.scale[rows], dtype=np.float32)
+        offset = np.asarray(self.offset[rows], dtype=np.float32)
+        if values.ndim == 2:
+            scale, offset = scale[:, None], offset[:, None]
+        return (values + 128) * scale + offset
+
+
+def quantize(similarity_matrix, dtype:str="int8", block_size:int=1024):
+    n_rows, n_cols = similarity_matrix.shape
+    if dtype == "float16":
+        data = np.empty((n_rows, n_cols), dtype=np.float16)
+        for start in range(0, n_rows, block_size):
+            data[start:start + block_size] = similarity_matrix[start:start + block_size]
+        return QuantizedMatrix(data)
+    if dtype != "int8":
+        raise ValueError(f"unknown dtype {dtype!r}, expected one of {QUANTIZED_DTYPES}")
+
+    data = np.empty((n_rows, n_cols), dtype=np.int8)
+    scale = np.empty(n_rows, dtype=np.float32)
+    offset = np.empty(n_rows, dtype=np.float32)
+    for start in range(0, n_rows, block_size):
+        block = np.asarray(similarity_matrix[start:start + block_size], dtype=np.float64)
+        lo, hi = block.min(axis=1), block.max(axis=1)
+        block_scale = np.where(hi > lo, (hi - lo) / 255, 1.0)
+        q = np.rint((block - lo[:, None]) / block_scale[:, None]) - 128
+        data[start:start + block.shape[0]] = np.clip(q, -128, 127)
+        scale[start:start + block.shape[0]] = block_scale
+        offset[start:start + block.shape[0]] = lo
+    return QuantizedMatrix(data, scale, offset)
+
+
+def save_quantized(matrix:QuantizedMatrix, path:str):
+    os.makedirs(path, exist_ok=True)
+    np.save(os.path.join(path, "data.npy"), matrix.data)
+    if matrix.scale is not None:
+        np.save(os.path.join(path, "scale.npy"), matrix.scale)
+        np.save(os.path.join(path, "offset.npy"), matrix.offset)
+
+
+def load_quantized(path:str, mmap_mode=None):
+    data = np.load(os.path.join(path, "data.npy"), mmap_mode=mmap_mode)
+    if not os.path.exists(os.path.join(path, "scale.npy")):
+        return QuantizedMatrix(data)
+    return QuantizedMatrix(
+        data,
+        np.load(os.path.join(path, "scale.npy")),
+        np.load(os.path.join(path, "offset.npy")),
+    )
+
+
+def quantization_report(original, quantized:QuantizedMatrix, k:int=10, n_queries:int=200, seed:int=0):
+    """
+    Memory saved and ranking agreement of a quantized matrix, on random rows:
+    mean top-k overlap (query excluded), and the largest absolute score error
+    among the top-k, which is what the app shows as "% Match".
+    """
+    rng = np.random.default_rng(seed)
+    queries = rng.choice(len(quantized), size=min(n_queries, len(quantized)), replace=False)
+    overlaps, score_errors = [], []
+    for i in queries:
+        # a copy: original may be a read-only memmap, and float64 rows would otherwise be views
+        exact = np.array(original[i], dtype=np.float64)
+        approx = quantized[i]
+        exact[i] = approx[i] = -np.inf
+        top_exact = np.argpartition(-exact, k - 1)[:k]
+        top_approx = np.argpartition(-approx, k - 1)[:k]
+        overlaps.append(np.intersect1d(top_exact, top_approx).shape[0] / k)
+        score_errors.append(np.abs(approx[top_approx] - exact[top_approx]).max())
+
+    original_bytes = original.nbytes
+    return {
+        "dtype": str(quantized.dtype),
+        "original_bytes": int(original_bytes),
+        "quantized_bytes": int(quantized.nbytes),
+        "saved_bytes": int(original_bytes - quantized.nbytes),
+        "compression": original_bytes / quantized.nbytes,
+        f"top{k}_overlap": float(np.mean(overlaps)),
+        "max_score_error": float(np.max(score_errors)),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Quantize a dense similarity matrix")
+    parser.add_argument("similarity_matrix", help="path to the dense .npy similarity matrix")
+    parser.add_argument("output", help="directory to write the quantized matrix to")
+    parser.add_argument("--dtype", choices=QUANTIZED_DTYPES, default="int8")
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    sim_matrix = np.load(args.similarity_matrix, mmap_mode="r")
+    matrix = quantize(sim_matrix, dtype=args.dtype)
+    save_quantized(matrix, args.output)
+    for key, value in quantization_report(sim_matrix, matrix, k=args.k).items():
+        print(f"{key:>18}: {value}")
@@ -0,0 +1,586 @@
+"""
+Search indexes over the articles table, built once at load time, and query
+tokenization.
+
+The BM25 index over titles and abstracts is built offline:
+
+    python search.py preprocessed_articles.csv data/bm25
+"""
+import argparse
+import collections
+import functools
+import itertools
+import json
+import math
+import os
+import re
+
+import numpy as np
+
+TOKEN_RE = re.compile(r"\w+")
+
+
+def title_tokens(title:str):
+    return TOKEN_RE.findall(str(title).lower())
+
+
+# spaCy's English stop words (spacy.lang.en.stop_words, lower-cased), frozen
+# here so the default tokenizer never imports spaCy
+STOP_WORDS = frozenset((
+    "'d", "'ll", "'m", "'re", "'s", "'ve", "a", "about", "above", "across", "after", "afterwards",
+    "again", "against", "all", "almost", "alone", "along", "already", "also", "although", "always",
+    "am", "among", "amongst", "amount", "an", "and", "another", "any", "anyhow", "anyone",
+    "anything", "anyway", "anywhere", "are", "around", "as", "at", "back", "be", "became",
+    "because", "become", "becomes", "becoming", "been", "before", "beforehand", "behind", "being",
+    "below", "beside", "besides", "between", "beyond", "both", "bottom", "but", "by", "ca", "call",
+    "can", "cannot", "could", "did", "do", "does", "doing", "done", "down", "due", "during",
+    "each", "eight", "either", "eleven", "else", "elsewhere", "empty", "enough", "even", "ever",
+    "every", "everyone", "everything", "everywhere", "except", "few", "fifteen", "fifty", "first",
+    "five", "for", "former", "formerly", "forty", "four", "from", "front", "full", "further",
+    "get", "give", "go", "had", "has", "have", "he", "hence", "her", "here", "hereafter", "hereby",
+    "herein", "hereupon", "hers", "herself", "him", "himself", "his", "how", "however", "hundred",
+    "i", "if", "in", "indeed", "into", "is", "it", "its", "itself", "just", "keep", "last",
+    "latter", "latterly", "least", "less", "made", "make", "many", "may", "me", "meanwhile",
+    "might", "mine", "more", "moreover", "most", "mostly", "move", "much", "must", "my", "myself",
+    "n't", "name", "namely", "neither", "never", "nevertheless", "next", "nine", "no", "nobody",
+    "none", "noone", "nor", "not", "nothing", "now", "nowhere", "n‘t", "n’t", "of", "off", "often",
+    "on", "once", "one", "only", "onto", "or", "other", "others", "otherwise", "our", "ours",
+    "ourselves", "out", "over", "own", "part", "per", "perhaps", "please", "put", "quite",
+    "rather", "re", "really", "regarding", "same", "say", "see", "seem", "seemed", "seeming",
+    "seems", "serious", "several", "she", "should", "show", "side", "since", "six", "sixty", "so",
+    "some", "somehow", "someone", "something", "sometime", "sometimes", "somewhere", "still",
+    "such", "take", "ten", "than", "that", "the", "their", "them", "themselves", "then", "thence",
+    "there", "thereafter", "thereby", "therefore", "therein", "thereupon", "these", "they",
+    "third", "this", "those", "though", "three", "through", "throughout", "thru", "thus", "to",
+    "together", "too", "top", "toward", "towards", "twelve", "twenty", "two", "under", "unless",
+    "until", "up", "upon", "us", "used", "using", "various", "very", "via", "was", "we", "well",
+    "were", "what", "whatever", "when", "whence", "whenever", "where", "whereafter", "whereas",
+    "whereby", "wherein", "whereupon", "wherever", "whether", "which", "while", "whither", "who",
+    "whoever", "whole", "whom", "whose", "why", "will", "with", "within", "without", "would",
+    "yet", "you", "your", "yours", "yourself", "yourselves", "‘d", "‘ll", "‘m", "‘re", "‘s", "‘ve",
+    "’d", "’ll", "’m", "’re", "’s", "’ve",
+))
+
+
+def get_stop_words():
+    return STOP_WORDS
+
+
+# the en_core_web_sm model is only loaded when tokenizer="spacy" is explicitly asked for
+@functools.lru_cache(maxsize=None)
+def get_nlp():
+    import spacy
+    return spacy.load("en_core_web_sm")
+
+
+def tokenize_query(text:str, tokenizer:str="fast"):
+    """
+    Normalized, stop-word free query tokens. tokenizer="fast" is a regex split
+    against a frozen stop-word set; tokenizer="spacy" runs the full spaCy
+    pipeline first (loaded on first use).
+    """
+    stop_words = get_stop_words()
+    if tokenizer == "spacy":
+        words = " ".join(token.text for token in get_nlp()(text))
+    elif tokenizer == "fast":
+        words = text
+    else:
+        raise ValueError(f"unknown tokenizer {tokenizer!r}, expected 'fast' or 'spacy'")
+    return [t for t in title_tokens(words) if t not in stop_words]
+
+
+class KeywordIndex:
+    """
+    Inverted index from normalized title token to the sorted row ids of the
+    articles whose title contains it.
+    """
+    def __init__(self, postings:dict, n_docs:int):
+        self.postings = postings
+        self.n_docs = n_docs
+
+    @classmethod
+    def from_titles(cls, titles):
+        postings = {}
+        n_docs = 0
+        for row, title in enumerate(titles):
+            for token in set(title_tokens(title)):
+                postings.setdefault(token, []).append(row)
+            n_docs += 1
+        postings = {token: np.asarray(rows, dtype=np.int32) for token, rows in postings.items()}
+        return cls(postings, n_docs)
+
+    def add(self, titles, start_row:int=None):
+        """
+        Index new titles as rows start_row, start_row + 1, ... (by default right
+        after the current last row). New row ids are larger than every indexed
+        one, so appending keeps the postings lists sorted.
+        """
+        start_row = self.n_docs if start_row is None else start_row
+        additions = {}
+        for row, title in enumerate(titles, start=start_row):
+            for token in set(title_tokens(title)):
+                additions.setdefault(token, []).append(row)
+            self.n_docs += 1
+        for token, rows in additions.items():
+            rows = np.asarray(rows, dtype=np.int32)
+            current = self.postings.get(token)
+            self.postings[token] = rows if current is None else np.concatenate([current, rows])
+        return self
+
+    def search(self, tokens, mode:str="any", k:int=None):
+        """
+        Rows matching the query tokens, ranked by the number of distinct tokens
+        they contain (ties in corpus order); only the first k when k is given.
+        mode="any" is the union of the postings lists, mode="all" their
+        intersection.
+
+        Returns (rows, match_counts).
+        """
+        tokens = set(tokens)
+        lists = [self.postings[t] for t in tokens if t in self.postings]
+        if not lists or (mode == "all" and len(lists) < len(tokens)):
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.intp)
+
+        rows, counts = np.unique(np.concatenate(lists), return_counts=True)
+        if mode == "all":
+            keep = counts == len(tokens)
+            rows, counts = rows[keep], counts[keep]
+
+        order = np.argsort(-counts, kind="stable")[:k]
+        return rows[order], counts[order]
+
+
+def normalize_title(title:str):
+    # case, punctuation and whitespace folded: "Attention Is All  You Need!" -> "attention is all you need"
+    return " ".join(TOKEN_RE.findall(str(title).casefold()))
+
+
+class TitleIndex:
+    """
+    Normalized title -> row ids. Duplicate titles are kept explicitly: every
+    title owns a slot, and the row ids of slot s are ids[offsets[s]:offsets[s + 1]]
+    in the order they appeared.
+    """
+    def __init__(self, slots:dict, offsets, ids):
+        self.slots = slots
+        self.offsets = offsets
+        self.ids = ids
+
+    @classmethod
+    def from_titles(cls, titles, ids=None):
+        titles = list(titles)
+        ids = np.arange(len(titles)) if ids is None else np.asarray(ids)
+        slots = {}
+        slot_of_row = np.fromiter(
+            (slots.setdefault(normalize_title(t), len(slots)) for t in titles),
+            dtype=np.int64, count=len(titles),
+        )
+        order = np.argsort(slot_of_row, kind="stable")
+        offsets = np.zeros(len(slots) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(slot_of_row, minlength=len(slots)), out=offsets[1:])
+        return cls(slots, offsets, ids[order].astype(np.int32))
+
+    @classmethod
+    def from_indices(cls, indices):
+        # the indices CSV: title as index, row id in the first column
+        return cls.from_titles(indices.index, indices.iloc[:, 0].values)
+
+    def add(self, titles, ids):
+        """
+        Add (title, row id) pairs. A title that is already indexed gains the new
+        id after its existing ones; the id arrays are rebuilt in O(total ids).
+        """
+        new_slots = np.fromiter(
+            (self.slots.setdefault(normalize_title(t), len(self.slots)) for t in titles),
+            dtype=np.int64,
+        )
+        old_slots = np.repeat(np.arange(self.offsets.shape[0] - 1), np.diff(self.offsets))
+        slot_of_id = np.concatenate([old_slots, new_slots])
+        ids = np.concatenate([self.ids, np.asarray(ids, dtype=self.ids.dtype)])
+
+        order = np.argsort(slot_of_id, kind="stable")
+        offsets = np.zeros(len(self.slots) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(slot_of_id, minlength=len(self.slots)), out=offsets[1:])
+        self.offsets, self.ids = offsets, ids[order]
+        return self
+
+    def __len__(self):
+        return len(self.slots)
+
+    def __contains__(self, title):
+        return normalize_title(title) in self.slots
+
+    def lookup_all(self, title:str):
+        slot = self.slots.get(normalize_title(title))
+        if slot is None:
+            return self.ids[:0]
+        return self.ids[self.offsets[slot]:self.offsets[slot + 1]]
+
+    def lookup(self, titles, missing:int=-1):
+        """
+        First row id of every title in one call; misses map to `missing`
+        instead of raising.
+        """
+        slots = np.fromiter(
+            (self.slots.get(normalize_title(t), -1) for t in titles),
+            dtype=np.int64,
+        )
+        found = slots >= 0
+        result = np.full(slots.shape[0], missing, dtype=np.int64)
+        result[found] = self.ids[self.offsets[slots[found]]]
+        return result
+
+
+# postings scanned by one fuzzy title lookup before the query is deemed too unspecific
+FUZZY_MAX_CANDIDATES = 5000
+
+
+def title_ngrams(title:str, n:int=3):
+    # padded so word starts / ends form their own grams: "ab" -> {"  a", " ab", "ab "}
+    padded = f"  {normalize_title(title)} "
+    return {padded[i:i + n] for i in range(len(padded) - n + 1)}
+
+
+class TrigramIndex:
+    """
+    Character trigram index over the normalized titles of a TitleIndex, for
+    typo-tolerant title lookup. Titles are scored by the Jaccard similarity of
+    their trigram sets with the query's.
+
+    Both directions are stored as CSR arrays: the trigrams of slot s are
+    slot_grams[slot_indptr[s]:slot_indptr[s + 1]], the slots holding trigram g
+    are post_slots[post_indptr[g]:post_indptr[g + 1]].
+
+    max_candidates bounds the postings a search scans (see search).
+    """
+    def __init__(self, title_index:TitleIndex, vocab:dict, slot_indptr, slot_grams, post_indptr, post_slots,
+                 max_candidates:int=FUZZY_MAX_CANDIDATES):
+        self.title_index = title_index
+        self.max_candidates = max_candidates
+        self.vocab = vocab
+        self.slot_indptr = slot_indptr
+        self.slot_grams = slot_grams
+        self.post_indptr = post_indptr
+        self.post_slots = post_slots
+
+    @classmethod
+    def from_title_index(cls, title_index:TitleIndex, max_candidates:int=FUZZY_MAX_CANDIDATES):
+        empty = np.zeros(1, dtype=np.int64)
+        index = cls(title_index, {}, empty, np.empty(0, dtype=np.int32), empty, np.empty(0, dtype=np.int32),
+                    max_candidates=max_candidates)
+        return index.update()
+
+    def __len__(self):
+        return self.slot_indptr.shape[0] - 1
+
+    def update(self):
+        """
+        Index the titles added to the TitleIndex since this index was built
+        (TitleIndex.add); the postings are rebuilt in O(total trigrams).
+        """
+        new_titles = list(itertools.islice(self.title_index.slots, len(self), None))
+        if not new_titles:
+            return self
+        vocab = self.vocab
+        grams = [[vocab.setdefault(g, len(vocab)) for g in title_ngrams(t)] for t in new_titles]
+        lengths = np.fromiter((len(g) for g in grams), dtype=np.int64, count=len(grams))
+        new_grams = np.fromiter(itertools.chain.from_iterable(grams), dtype=np.int32, count=int(lengths.sum()))
+
+        self.slot_grams = np.concatenate([self.slot_grams, new_grams])
+        self.slot_indptr = np.concatenate([self.slot_indptr, self.slot_indptr[-1] + np.cumsum(lengths)])
+
+        slot_of_gram = np.repeat(np.arange(len(self), dtype=np.int32), np.diff(self.slot_indptr))
+        order = np.argsort(self.slot_grams, kind="stable")
+        self.post_slots = slot_of_gram[order]
+        post_indptr = np.zeros(len(vocab) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.slot_grams, minlength=len(vocab)), out=post_indptr[1:])
+        self.post_indptr = post_indptr
+        return self
+
+    def search(self, title:str, k:int=1, threshold:float=0.5, max_candidates:int=None):
+        """
+        Rows of the k titles most similar to `title` with a Jaccard similarity of
+        at least `threshold`, best first, as (rows, scores).
+
+        A title reaching the threshold shares at least ceil(threshold * |q|) of
+        the query's |q| trigrams, so it must hold one of the |q| - that + 1
+        rarest ones: only the slots in those postings lists are candidates.
+        When those lists hold more than max_candidates entries (default: the
+        index's; an index built with max_candidates=None has no cap), only the
+        rarest lists that fit are read. A near-miss title shares nearly all of
+        the query's rare trigrams and is still found; titles sharing only
+        common trigrams with the query may be missed.
+        """
+        none = np.empty(0, dtype=np.int64), np.empty(0)
+        if max_candidates is None:
+            max_candidates = self.max_candidates
+        query = title_ngrams(title)
+        known = np.fromiter((self.vocab[g] for g in query if g in self.vocab), dtype=np.int64)
+        min_shared = max(1, math.ceil(threshold * len(query)))
+        if known.size < min_shared:
+            return none
+
+        lengths = self.post_indptr[known + 1] - self.post_indptr[known]
+        order = np.argsort(lengths, kind="stable")
+        n_lists = known.size - min_shared + 1
+        if max_candidates is not None:
+            n_lists = min(n_lists, int(np.searchsorted(np.cumsum(lengths[order]), max_candidates, side="right")))
+            if n_lists == 0:
+                return none
+        prefix = known[order[:n_lists]]
+        candidates, prefix_hits = np.unique(
+            np.concatenate([self.post_slots[self.post_indptr[g]:self.post_indptr[g + 1]] for g in prefix]), return_counts=True)
+
+        # a candidate shares at most its prefix hits plus every non-prefix trigram (and
+        # no more than its size); drop those that cannot reach the threshold even so,
+        # i.e. shared * (1 + threshold) < threshold * (|q| + size), before the gather
+        sizes = self.slot_indptr[candidates + 1] - self.slot_indptr[candidates]
+        bound = np.minimum(prefix_hits + (known.size - prefix.size), sizes)
+        reachable = bound * (1 + threshold) >= threshold * (len(query) + sizes) - 1e-9
+        candidates = candidates[reachable]
+        if candidates.size == 0:
+            return none
+
+        # shared trigrams of every candidate, read from its CSR row
+        starts, ends = self.slot_indptr[candidates], self.slot_indptr[candidates + 1]
+        sizes = ends - starts
+        pos = np.repeat(starts - np.r_[0, np.cumsum(sizes)[:-1]], sizes) + np.arange(sizes.sum())
+        hits = np.isin(self.slot_grams[pos], known)
+        shared = np.bincount(np.repeat(np.arange(candidates.size), sizes), weights=hits, minlength=candidates.size)
+        scores = shared / (len(query) + sizes - shared)
+
+        keep = np.flatnonzero(scores >= threshold)
+        order = keep[np.argsort(-scores[keep], kind="stable")[:k]]
+        slots = candidates[order]
+        rows = self.title_index.ids[self.title_index.offsets[slots]].astype(np.int64)
+        return rows, scores[order]
+
+
+BM25_FILES = ("indptr", "docs", "tfs", "impacts", "doc_len", "impact_order")
+
+
+class BM25Index:
+    """
+    BM25-ranked inverted index over title + abstract; title tokens count
+    title_weight times. Postings are CSR arrays by term id: the documents
+    holding term t are docs[indptr[t]:indptr[t + 1]] (ascending), with their
+    term frequencies in tfs. Document lengths and IDF are precomputed into one
+    BM25 impact per posting, so a query only gathers and sums the impacts of
+    its terms' postings. impact_order lists every term's postings by
+    descending impact (positions into docs), so a top-k search reads each
+    list only as deep as the k-th score needs.
+
+    Drop-in for KeywordIndex in search_keywords / get_recommendation_list:
+    search(tokens, mode, k) returns (rows, scores), best first.
+    """
+    def __init__(self, vocab:dict, indptr, docs, tfs, doc_len, impacts=None, k1:float=1.2, b:float=0.75, title_weight:int=2,
+                 stop_words:frozenset=frozenset(), impact_order=None):
+        self.vocab = vocab
+        self.indptr = indptr
+        self.docs = docs
+        self.tfs = tfs
+        self.doc_len = doc_len
+        self.k1 = k1
+        self.b = b
+        self.title_weight = title_weight
+        # tokens left out of documents, at build time and by add()
+        self.stop_words = frozenset(stop_words)
+        self.impacts = self._impacts() if impacts is None else impacts
+        self.impact_order = self._impact_order() if impact_order is None else impact_order
+
+    @property
+    def n_docs(self):
+        return self.doc_len.shape[0]
+
+    def _impacts(self):
+        df = np.diff(self.indptr).astype(np.float64)
+        idf = np.log1p((self.n_docs - df + 0.5) / (df + 0.5))
+        avgdl = self.doc_len.mean() if self.n_docs else 1.0
+        tf = self.tfs.astype(np.float64)
+        norm = self.k1 * (1 - self.b + self.b * self.doc_len[self.docs] / avgdl)
+        return (np.repeat(idf, np.diff(self.indptr)) * tf * (self.k1 + 1) / (tf + norm)).astype(np.float32)
+
+    def _impact_order(self):
+        # by term, then descending impact; stable, so equal impacts stay in corpus order
+        term_of = np.repeat(np.arange(self.indptr.shape[0] - 1), np.diff(self.indptr))
+        return np.lexsort((-self.impacts, term_of)).astype(np.int64)
+
+    @staticmethod
+    def _postings(titles, abstracts, start_row:int, vocab:dict, title_weight:int, stop_words:frozenset):
+        terms, docs, tfs, doc_len = [], [], [], []
+        abstracts = itertools.repeat("") if abstracts is None else abstracts
+        for row, (title, abstract) in enumerate(zip(titles, abstracts), start=start_row):
+            counts = collections.Counter()
+            for token in title_tokens(title):
+                counts[token] += title_weight
+            counts.update(title_tokens(abstract))
+            length = 0
+            for token, tf in counts.items():
+                if token in stop_words:
+                    continue
+                terms.append(vocab.setdefault(token, len(vocab)))
+                docs.append(row)
+                tfs.append(tf)
+                length += tf
+            doc_len.append(length)
+        return (np.asarray(terms, dtype=np.int64), np.asarray(docs, dtype=np.int32),
+                np.asarray(tfs, dtype=np.int32), np.asarray(doc_len, dtype=np.float32))
+
+    @staticmethod
+    def _csr(terms, docs, tfs, n_terms:int):
+        # stable, so every postings list keeps its documents in ascending order
+        order = np.argsort(terms, kind="stable")
+        indptr = np.zeros(n_terms + 1, dtype=np.int64)
+        np.cumsum(np.bincount(terms, minlength=n_terms), out=indptr[1:])
+        return indptr, docs[order], tfs[order]
+
+    @classmethod
+    def from_texts(cls, titles, abstracts=None, title_weight:int=2, stop_words:frozenset=frozenset(), k1:float=1.2, b:float=0.75):
+        vocab = {}
+        terms, docs, tfs, doc_len = cls._postings(titles, abstracts, 0, vocab, title_weight, stop_words)
+        indptr, docs, tfs = cls._csr(terms, docs, tfs, len(vocab))
+        return cls(vocab, indptr, docs, tfs, doc_len, k1=k1, b=b, title_weight=title_weight, stop_words=stop_words)
+
+    def add(self, titles, start_row:int=None, abstracts=None):
+        """
+        Index new articles as rows n_docs, n_docs + 1, ..., with the stop words
+        the index was built with. Document frequencies and the average length
+        change, so every impact is recomputed.
+        """
+        if start_row is not None and start_row != self.n_docs:
+            raise ValueError(f"new rows must follow the last indexed one ({self.n_docs}), got {start_row}")
+        terms, docs, tfs, doc_len = self._postings(titles, abstracts, self.n_docs, self.vocab, self.title_weight, self.stop_words)
+        old_terms = np.repeat(np.arange(self.indptr.shape[0] - 1), np.diff(self.indptr))
+        self.indptr, self.docs, self.tfs = self._csr(
+            np.concatenate([old_terms, terms]),
+            np.concatenate([self.docs, docs]),
+            np.concatenate([self.tfs, tfs]),
+            len(self.vocab),
+        )
+        self.doc_len = np.concatenate([self.doc_len, doc_len])
+        self.impacts = self._impacts()
+        self.impact_order = self._impact_order()
+        return self
+
+    def search(self, tokens, mode:str="any", k:int=None):
+        """
+        Rows matching the query tokens by BM25 score, best first (ties in corpus
+        order), as (rows, scores); only the top k when k is given. mode="all"
+        keeps the rows holding every token.
+        """
+        # the query as a sparse vector: term id -> count
+        query = collections.Counter(tokens)
+        terms = np.fromiter((self.vocab.get(t, -1) for t in query), dtype=np.int64, count=len(query))
+        weights = np.fromiter(query.values(), dtype=np.float64, count=len(query))
+        known = terms >= 0
+        if not known.any() or (mode == "all" and not known.all()):
+            return np.empty(0, dtype=np.int32), np.empty(0)
+        terms, weights = terms[known], weights[known]
+
+        if k is None:
+            rows, scores = self._score_all(terms, weights, mode)
+        else:
+            rows, scores = self._score_top(terms, weights, mode, k)
+
+        # rows are ascending, so a stable sort keeps ties in corpus order; every row
+        # tying the k-th score stays a candidate so the earliest ones are kept
+        if k is not None and k < rows.size:
+            candidates = np.flatnonzero(scores >= np.partition(scores, rows.size - k)[rows.size - k])
+        else:
+            candidates = np.arange(rows.size)
+        order = candidates[np.argsort(-scores[candidates], kind="stable")][:k]
+        return rows[order], scores[order]
+
+    def _score_all(self, terms, weights, mode:str):
+        # every matching row (ascending) and its score
+        starts, ends = self.indptr[terms], self.indptr[terms + 1]
+        lengths = ends - starts
+        pos = np.repeat(starts - np.r_[0, np.cumsum(lengths)[:-1]], lengths) + np.arange(lengths.sum())
+        rows, inverse = np.unique(self.docs[pos], return_inverse=True)
+        scores = np.bincount(inverse, weights=self.impacts[pos] * np.repeat(weights, lengths), minlength=rows.size)
+        if mode == "all":
+            keep = np.bincount(inverse, minlength=rows.size) == terms.size
+            rows, scores = rows[keep], scores[keep]
+        return rows, scores
+
+    def _score_top(self, terms, weights, mode:str, k:int):
+        """
+        Rows (ascending) and scores of a superset of the top k, reading the
+        postings lists in impact order. The rows among the first `depth` entries
+        of any list are scored exactly, each list binary-searched for them; a
+        row deeper than `depth` in every list scores at most the sum of the
+        lists' next impacts. Once the k-th seen score beats that bound no unseen
+        row can enter the top k, else the depth grows fourfold.
+        """
+        starts, ends = self.indptr[terms], self.indptr[terms + 1]
+        depth = max(k, 128)
+        while True:
+            rows = np.unique(np.concatenate([
+                self.docs[self.impact_order[start:min(start + depth, end)]] for start, end in zip(starts, ends)]))
+            scores = np.zeros(rows.size)
+            matched = np.zeros(rows.size, dtype=np.int64)
+            bound = 0.0
+            for start, end, weight in zip(starts, ends, weights):
+                docs = self.docs[start:end]
+                at = np.minimum(np.searchsorted(docs, rows), end - start - 1)
+                hit = docs[at] == rows
+                scores += np.where(hit, self.impacts[start + at] * weight, 0.0)
+                matched += hit
+                if start + depth < end:
+                    bound += weight * float(self.impacts[self.impact_order[start + depth]])
+            if mode == "all":
+                keep = matched == terms.size
+                rows, scores = rows[keep], scores[keep]
+            if bound == 0.0 or (rows.size >= k and np.partition(scores, rows.size - k)[rows.size - k] > bound):
+                return rows, scores
+            depth *= 4
+
+
+def save_bm25_index(index:BM25Index, path:str):
+    os.makedirs(path, exist_ok=True)
+    for name in BM25_FILES:
+        np.save(os.path.join(path, f"{name}.npy"), getattr(index, name))
+    with open(os.path.join(path, "meta.json"), "w") as f:
+        # terms in id order
+        json.dump({
+            "k1": index.k1,
+            "b": index.b,
+            "title_weight": index.title_weight,
+            "stop_words": sorted(index.stop_words),
+            "terms": list(index.vocab),
+        }, f)
+
+
+def load_bm25_index(path:str, mmap_mode=None):
+    with open(os.path.join(path, "meta.json")) as f:
+        meta = json.load(f)
+    # indexes saved without impact_order get it recomputed on load
+    arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode) for name in BM25_FILES
+              if os.path.exists(os.path.join(path, f"{name}.npy"))}
+    vocab = {term: i for i, term in enumerate(meta["terms"])}
+    return BM25Index(vocab, k1=meta["k1"], b=meta["b"], title_weight=meta["title_weight"],
+                     stop_words=frozenset(meta.get("stop_words", ())), **arrays)
+
+
+if __name__ == "__main__":
+    import pandas as pd
+
+    parser = argparse.ArgumentParser(description="Build the BM25 keyword index over article titles and abstracts")
+    parser.add_argument("articles", help="articles CSV with title and abstract columns")
+    parser.add_argument("output", help="directory to write the index to, e.g. data/bm25")
+    parser.add_argument("--title-weight", type=int, default=2, help="times a title token counts")
+    parser.add_argument("--k1", type=float, default=1.2)
+    parser.add_argument("--b", type=float, default=0.75)
+    args = parser.parse_args()
+
+    articles = pd.read_csv(args.articles, usecols=["title", "abstract"])
+    index = BM25Index.from_texts(
+        articles.title.values,
+        articles.abstract.fillna("").values,
+        title_weight=args.title_weight,
+        stop_words=get_stop_words(),
+        k1=args.k1,
+        b=args.b,
+    )
+    save_bm25_index(index, args.output)
+    print(f"{index.n_docs} articles, {len(index.vocab)} terms, {index.docs.shape[0]} postings")
@@ -0,0 +1,372 @@
+"""
+Headless HTTP/JSON recommendation service, independent of Streamlit.
+
+Artifacts are loaded once (loader.py, or a synthetic corpus with --synthetic).
+An asyncio front end (stdlib only, HTTP/1.1 with keep-alive) accepts
+connections and hands the CPU work to a worker pool: threads sharing one copy
+of the artifacts, or processes that each memory-map them (--executor process).
+
+    GET  /health
+    GET  /recommend?q=<title or keywords>&k=10      get_recommendation_list
+    GET  /similar?title=<title>&k=10                 micro-batched, see below
+    GET  /similar?id=<article id>&k=10
+    POST /similar  {"queries": [...], "by": "title" | "id", "k": 10}
+    GET  /personalized?user=<personId>&mode=profile&k=10
+    GET  /sample?n=100                               random titles, for load tests
+
+Concurrent /similar GETs with the same (by, k) are coalesced for up to
+--batch-delay-ms or --max-batch requests into one get_recommendation_lists
+call, which ranks the whole batch with one block top-k.
+
+    python service.py --port 8000 --workers 4
+    python service.py --synthetic 100000      # no artifacts needed
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from cache import ResultCache
+from utils import get_personalized_recommendations, get_recommendation_list, get_recommendation_lists
+
+RESULT_COLUMNS = ["row", "id", "title", "category_name", "score"]
+MAX_K = 100
+
+# artifacts of the current process, set by load_state / _init_worker
+_state = None
+
+
+def load_state(synthetic:int=None, cache_size:int=1024, fuzzy_max_candidates:int=None):
+    if synthetic:
+        sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks"))
+        from synthetic import make_corpus
+        from loader import build_search_indexes
+        corpus = make_corpus(synthetic)
+        articles, sim_matrix = corpus["articles"], corpus["similarity"]
+        indices, interactions = corpus["indices"], corpus["interactions"]
+        search_indexes = build_search_indexes(articles, indices, interactions, fuzzy_max_candidates=fuzzy_max_candidates)
+    else:
+        from loader import load_artifacts
+        articles, sim_matrix, indices, interactions, search_indexes = load_artifacts()
+        if fuzzy_max_candidates is not None:
+            search_indexes["fuzzy"].max_candidates = fuzzy_max_candidates
+    return {
+        "articles": articles,
+        "sim_matrix": sim_matrix,
+        "indices": indices,
+        "interactions": interactions,
+        "search_indexes": search_indexes,
+        "cache": ResultCache(maxsize=cache_size, version=search_indexes["version"]),
+    }
+
+
+def _init_worker(synthetic:int, cache_size:int, fuzzy_max_candidates:int=None):
+    global _state
+    _state = load_state(synthetic, cache_size, fuzzy_max_candidates)
+
+
+def _records(recommendations):
+    # row positions are the frame index of get_recommendation_list results
+    frame = recommendations.assign(row=recommendations.index.values)
+    return frame[[c for c in RESULT_COLUMNS if c in frame]].to_dict("records")
+
+
+def _recommend(query:str, k:int):
+    s = _state
+    recommendations = get_recommendation_list(
+        similarity_matrix=s["sim_matrix"],
+        indices=s["indices"],
+        title_or_keyword=query,
+        df=s["articles"],
+        k=k,
+        keyword_index=s["search_indexes"]["keyword"],
+        title_index=s["search_indexes"]["title"],
+        fuzzy_index=s["search_indexes"].get("fuzzy"),
+        cache=s["cache"],
+    )
+    return {"match": recommendations.attrs.get("query"), "results": _records(recommendations)}
+
+
+def _similar_batch(by:str, k:int, queries:list):
+    s = _state
+    # repeated queries (concurrent GETs for one title, or a repeated POST entry) are
+    # ranked once; every caller then looks its result up by query
+    frame = get_recommendation_lists(
+        s["sim_matrix"],
+        s["indices"],
+        list(dict.fromkeys(queries)),
+        s["articles"],
+        k=k,
+        by=by,
+        title_index=s["search_indexes"]["title"],
+        article_ids=s["search_indexes"]["article_ids"],
+    )
+    columns = ["rank", "row", "id", "title", "score"]
+    return {query: group[columns].to_dict("records") for query, group in frame.groupby("query", sort=False)}
+
+
+def _personalized(user, mode:str, k:int):
+    s = _state
+    interactions = s["interactions"]
+    if user is None:
+        user = interactions.personId.values[np.random.randint(len(interactions))]
+    elif len(s["search_indexes"]["interactions"].history_rows(user)) == 0:
+        raise KeyError(f"no interactions for user {user}")
+    recommendations, query_title, user = get_personalized_recommendations(
+        user_id=user,
+        interactions=interactions,
+        articles=s["articles"],
+        similarity_matrix=s["sim_matrix"],
+        indices=s["indices"],
+        title_index=s["search_indexes"]["title"],
+        interaction_index=s["search_indexes"]["interactions"],
+        article_ids=s["search_indexes"]["article_ids"],
+        mode=mode,
+        k=k,
+    )
+    return {"user": user, "query_title": query_title, "results": _records(recommendations)}
+
+
+def _sample(n:int):
+    titles = _state["articles"].title.values
+    return titles[np.random.randint(len(titles), size=n)].tolist()
+
+
+def _json_default(obj):
+    if isinstance(obj, np.generic):
+        return obj.item()
+    return str(obj)
+
+
+class MicroBatcher:
+    """
+    Coalesces single-query /similar requests arriving within max_delay seconds
+    (or until max_batch of them are waiting) into one batched call.
+    `run(by, k, queries)` is a coroutine returning {query: results}.
+    """
+    def __init__(self, run, max_batch:int=64, max_delay:float=0.002):
+        self.run = run
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._pending = {}
+
+    async def submit(self, by:str, k:int, query):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        key = (by, k)
+        batch = self._pending.setdefault(key, [])
+        batch.append((query, future))
+        if len(batch) >= self.max_batch:
+            self._flush(key)
+        elif len(batch) == 1:
+            # a stale timer from an already flushed batch only flushes the next one early
+            loop.call_later(self.max_delay, self._flush, key)
+        return await future
+
+    def _flush(self, key):
+        batch = self._pending.pop(key, None)
+        if batch:
+            asyncio.ensure_future(self._run_batch(key, batch))
+
+    async def _run_batch(self, key, batch):
+        try:
+            results = await self.run(*key, [query for query, _ in batch])
+        except Exception as exc:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        for query, future in batch:
+            if not future.done():
+                future.set_result(results.get(query, []))
+
+
+class RecommendationService:
+    def __init__(self, executor, max_batch:int=64, batch_delay:float=0.002):
+        self.executor = executor
+        self.batcher = MicroBatcher(self._similar_batch, max_batch=max_batch, max_delay=batch_delay)
+        self.routes = {
+            ("GET", "/health"): self.health,
+            ("GET", "/recommend"): self.recommend,
+            ("GET", "/similar"): self.similar,
+            ("POST", "/similar"): self.similar_many,
+            ("GET", "/personalized"): self.personalized,
+            ("GET", "/sample"): self.sample,
+        }
+
+    async def _call(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    async def _similar_batch(self, by:str, k:int, queries:list):
+        return await self._call(_similar_batch, by, k, queries)
+
+    @staticmethod
+    def _param(params:dict, name:str, default=None):
+        values = params.get(name)
+        if not values:
+            if default is None:
+                raise ValueError(f"missing parameter {name!r}")
+            return default
+        return values[0]
+
+    @staticmethod
+    def _k(value):
+        k = int(value)
+        if not 1 <= k <= MAX_K:
+            raise ValueError(f"k must be between 1 and {MAX_K}")
+        return k
+
+    async def health(self, params, body):
+        return {"status": "ok"}
+
+    async def recommend(self, params, body):
+        query = self._param(params, "q")
+        k = self._k(self._param(params, "k", 10))
+        return {"query": query, **await self._call(_recommend, query, k)}
+
+    async def similar(self, params, body):
+        k = self._k(self._param(params, "k", 10))
+        by = "id" if "id" in params else "title"
+        query = self._param(params, by)
+        results = await self.batcher.submit(by, k, query)
+        if not results:
+            raise KeyError(f"unknown {by} {query!r}")
+        return {"query": query, "results": results}
+
+    async def similar_many(self, params, body):
+        request = json.loads(body or b"{}")
+        if not isinstance(request, dict):
+            raise ValueError("body must be a JSON object")
+        queries = request.get("queries")
+        # titles or ids; bool is an int subclass but never a valid query
+        if not isinstance(queries, list) or not all(isinstance(q, (str, int)) and not isinstance(q, bool) for q in queries):
+            raise ValueError("body must hold a list of 'queries' (titles or ids)")
+        by = request.get("by", "title")
+        if by not in ("title", "id"):
+            raise ValueError(f"'by' must be 'title' or 'id', got {by!r}")
+        k = self._k(request.get("k", 10))
+        results = await self._call(_similar_batch, by, k, queries)
+        return {"results": [{"query": q, "results": results.get(q, [])} for q in queries]}
+
+    async def personalized(self, params, body):
+        user = params.get("user", [None])[0]
+        user = int(user) if user is not None else None
+        mode = self._param(params, "mode", "profile")
+        k = self._k(self._param(params, "k", 10))
+        return await self._call(_personalized, user, mode, k)
+
+    async def sample(self, params, body):
+        n = min(int(self._param(params, "n", 100)), 10_000)
+        return {"titles": await self._call(_sample, n)}
+
+    async def dispatch(self, method:str, target:str, body:bytes):
+        url = urlsplit(target)
+        handler = self.routes.get((method, url.path))
+        if handler is None:
+            return HTTPStatus.NOT_FOUND, {"error": f"no route {method} {url.path}"}
+        try:
+            return HTTPStatus.OK, await handler(parse_qs(url.query), body)
+        except KeyError as exc:
+            return HTTPStatus.NOT_FOUND, {"error": str(exc.args[0]) if exc.args else "not found"}
+        except ValueError as exc:
+            # json.JSONDecodeError is a ValueError too
+            return HTTPStatus.BAD_REQUEST, {"error": str(exc)}
+        except Exception as exc:
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {"error": f"{type(exc).__name__}: {exc}"}
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except asyncio.LimitOverrunError:
+                    await self._respond(writer, HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, {"error": "headers too large"}, False)
+                    break
+                request_line, *header_lines = head.decode("latin-1").rstrip("\r\n").split("\r\n")
+                try:
+                    method, target, version = request_line.split(" ", 2)
+                except ValueError:
+                    await self._respond(writer, HTTPStatus.BAD_REQUEST, {"error": "malformed request line"}, False)
+                    break
+                headers = {}
+                for line in header_lines:
+                    name, _, value = line.partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = headers.get("content-length", "0")
+                if not length.isdigit():
+                    await self._respond(writer, HTTPStatus.BAD_REQUEST, {"error": f"invalid Content-Length {length!r}"}, False)
+                    break
+                body = await reader.readexactly(int(length))
+
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                status, payload = await self.dispatch(method, target, body)
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _respond(writer, status:HTTPStatus, payload, keep_alive:bool):
+        data = json.dumps(payload, default=_json_default).encode()
+        head = (
+            f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1") + data)
+        await writer.drain()
+
+
+def make_executor(kind:str, workers:int, synthetic:int=None, cache_size:int=1024, fuzzy_max_candidates:int=None):
+    global _state
+    if kind == "process":
+        # each worker loads the artifacts itself; memory-mapped ones share the page cache
+        return ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(synthetic, cache_size, fuzzy_max_candidates))
+    if kind != "thread":
+        raise ValueError(f"unknown executor {kind!r}, expected 'thread' or 'process'")
+    _state = load_state(synthetic, cache_size, fuzzy_max_candidates)
+    return ThreadPoolExecutor(max_workers=workers)
+
+
+async def serve(host:str, port:int, service:RecommendationService):
+    server = await asyncio.start_server(service.handle_connection, host, port)
+    print(f"serving on http://{host}:{port}", file=sys.stderr)
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--executor", choices=["thread", "process"], default="thread")
+    parser.add_argument("--max-batch", type=int, default=64, help="largest coalesced /similar batch")
+    parser.add_argument("--batch-delay-ms", type=float, default=2.0, help="how long a /similar request waits for company")
+    parser.add_argument("--cache-size", type=int, default=1024, help="result cache entries per worker process")
+    parser.add_argument("--synthetic", type=int, default=None, help="serve a synthetic corpus of this many articles")
+    parser.add_argument("--fuzzy-max-candidates", type=int, default=None,
+                        help="postings a typo-tolerant title lookup may scan (default: CBRS_FUZZY_MAX_CANDIDATES or 5000)")
+    args = parser.parse_args()
+
+    executor = make_executor(args.executor, args.workers, synthetic=args.synthetic, cache_size=args.cache_size,
+                             fuzzy_max_candidates=args.fuzzy_max_candidates)
+    service = RecommendationService(executor, max_batch=args.max_batch, batch_delay=args.batch_delay_ms / 1e3)
+    try:
+        asyncio.run(serve(args.host, args.port, service))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        executor.shutdown(cancel_futures=True)
@@ -0,0 +1,35 @@
+"""
+Local on-disk storage for the similarity artifacts.
+
+Artifacts are fetched once into a local directory (artifacts.py) and then
+opened with np.load(..., mmap_mode='r'): startup does not read the matrix, pages are only
+faulted in when a row is queried, and several app processes on one host share
+the same OS page cache instead of holding private copies.
+"""
+import os
+
+import numpy as np
+
+from ann import load_ivf
+from embeddings import load_embeddings
+from neighbors import load_neighbor_table
+from quantize import load_quantized
+
+
+def open_similarity(path:str, mmap:bool=True):
+    """
+    Open a similarity artifact from local disk: a dense .npy matrix, or a
+    directory written by neighbors.save_neighbor_table, quantize.save_quantized,
+    embeddings.save_embeddings or ann.save_ivf.
+    """
+    mmap_mode = "r" if mmap else None
+    if os.path.isdir(path):
+        # an IVF index also holds vectors.npy
+        if os.path.exists(os.path.join(path, "centroids.npy")):
+            return load_ivf(path, mmap_mode=mmap_mode)
+        if os.path.exists(os.path.join(path, "vectors.npy")):
+            return load_embeddings(path, mmap_mode=mmap_mode)
+        if os.path.exists(os.path.join(path, "data.npy")):
+            return load_quantized(path, mmap_mode=mmap_mode)
+        return load_neighbor_table(path, mmap_mode=mmap_mode)
+    return np.load(path, mmap_mode=mmap_mode)
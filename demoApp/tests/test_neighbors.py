@@ -0,0 +1,59 @@
+"""
+Regression checks: neighbor tables built incrementally (update.py) or in
+parallel blocks (build_index.py) must equal a full build_neighbor_table over
+the same vectors.
+
+    python -m pytest tests
+"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ann import normalize_rows
+from build_index import build_neighbors_blocked
+from neighbors import build_neighbor_table, load_neighbor_table
+from update import update_neighbors
+
+
+def random_vectors(n:int, dim:int=16, seed:int=0):
+    return normalize_rows(np.random.default_rng(seed).standard_normal((n, dim)))
+
+
+def assert_same_table(table, expected):
+    np.testing.assert_array_equal(table.indptr, expected.indptr)
+    np.testing.assert_array_equal(table.indices, expected.indices)
+    np.testing.assert_allclose(table.scores, expected.scores, atol=1e-5)
+
+
+# block sizes below, at and above the existing corpus exercise the block merge
+@pytest.mark.parametrize("n_old, n_new, block_size", [(300, 40, 64), (250, 120, 250), (200, 30, 1000)])
+def test_update_neighbors_matches_full_build(n_old, n_new, block_size):
+    k = 10
+    vectors = random_vectors(n_old + n_new)
+    old, new = vectors[:n_old], vectors[n_old:]
+
+    table = update_neighbors(build_neighbor_table(old @ old.T, k=k), old, new, block_size=block_size)
+    assert_same_table(table, build_neighbor_table(vectors @ vectors.T, k=k))
+
+
+def test_update_neighbors_in_several_batches():
+    k = 8
+    vectors = random_vectors(360, seed=1)
+    table = build_neighbor_table(vectors[:200] @ vectors[:200].T, k=k)
+    for start, stop in [(200, 250), (250, 251), (251, 360)]:
+        table = update_neighbors(table, vectors[:start], vectors[start:stop], block_size=48)
+    assert_same_table(table, build_neighbor_table(vectors @ vectors.T, k=k))
+
+
+# chunks narrower than the corpus and more blocks than in-flight slots
+@pytest.mark.parametrize("workers", [1, 2])
+def test_build_neighbors_blocked_matches_full_build(tmp_path, workers):
+    k = 10
+    vectors = random_vectors(300, seed=2)
+    np.save(tmp_path / "vectors.npy", vectors)
+
+    build_neighbors_blocked(str(tmp_path / "vectors.npy"), str(tmp_path / "neighbors"), k=k, block_size=16, chunk_size=64, workers=workers)
+    assert_same_table(load_neighbor_table(str(tmp_path / "neighbors")), build_neighbor_table(vectors @ vectors.T, k=k))
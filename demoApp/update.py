@@ -0,0 +1,152 @@
+"""
+Incremental corpus updates: add a batch of new articles without recomputing
+all similarities.
+
+Only the new articles are vectorized (with the embeddings' fitted model). Their
+scores against the existing corpus are computed a block of existing vectors at
+a time, so the work is O(batch * N * d) rather than O(N^2 * d), and memory
+is O(block * batch). Every block yields
+
+  * top-K candidates for the new articles, merged into their running top-K, and
+  * for existing articles, the new articles that beat their current K-th
+    neighbor, merged into their lists; all other rows are left untouched.
+
+The neighbor table must hold cosine scores of the same embeddings and have a
+fixed width K per row, like build_neighbor_table's.
+
+    python update.py new_articles.csv --data-dir data
+
+The updated articles and indices CSVs are written to --data-dir under their
+artifact filenames, where load_artifacts reads them ahead of the artifact
+cache; a columnar articles copy there (articles.feather / .parquet) is
+rewritten too, so every table stays row-aligned with the neighbor table.
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from columnar import write_columnar
+from embeddings import article_texts, load_embeddings, save_embeddings
+from neighbors import NeighborTable, block_top_k, load_neighbor_table, save_neighbor_table
+from search import BM25Index, load_bm25_index, save_bm25_index
+
+
+def _merge_top_k(cols_a, scores_a, cols_b, scores_b, k:int):
+    cols = np.concatenate([cols_a, cols_b], axis=1)
+    scores = np.concatenate([scores_a, scores_b], axis=1)
+    order, top_scores = block_top_k(scores, k)
+    return np.take_along_axis(cols, order, axis=1), top_scores
+
+
+def update_neighbors(table:NeighborTable, vectors, new_vectors, block_size:int=8192):
+    """
+    Neighbor table over vectors + new_vectors, reusing `table` for the existing
+    rows. `vectors` are the existing (normalized) article vectors, row-aligned
+    with the table.
+    """
+    n, b = len(table), new_vectors.shape[0]
+    widths = np.diff(table.indptr)
+    if n and not (widths == widths[0]).all():
+        raise ValueError("incremental updates need a neighbor table with the same number of neighbors per row")
+    k = int(widths[0]) if n else min(50, b)
+
+    indices = np.array(table.indices, dtype=np.int32).reshape(n, k)
+    scores = np.array(table.scores, dtype=np.float32).reshape(n, k)
+    new_vectors = np.asarray(new_vectors, dtype=np.float32)
+
+    # new articles against each other, self included as in build_neighbor_table
+    within = new_vectors @ new_vectors.T
+    new_cols, new_scores = block_top_k(within, min(k, b))
+    new_cols = new_cols + n
+
+    for start in range(0, n, block_size):
+        block = np.asarray(vectors[start:start + block_size], dtype=np.float32) @ new_vectors.T
+        rows = block.shape[0]
+
+        # candidates from this block for the new articles
+        cand_cols, cand_scores = block_top_k(block.T, min(k, rows))
+        new_cols, new_scores = _merge_top_k(new_cols, new_scores, cand_cols + start, cand_scores, k)
+
+        # existing rows that some new article enters the top-K of
+        improved = np.flatnonzero(block.max(axis=1) > scores[start:start + rows, -1])
+        if improved.size:
+            sub = block[improved]
+            cand_cols, cand_scores = block_top_k(sub, min(k, b))
+            target = start + improved
+            indices[target], scores[target] = _merge_top_k(indices[target], scores[target], cand_cols + n, cand_scores, k)
+
+    if new_cols.shape[1] < k:
+        raise ValueError(f"corpus too small for {k} neighbors per article")
+
+    all_indices = np.concatenate([indices, new_cols.astype(np.int32)])
+    all_scores = np.concatenate([scores, new_scores.astype(np.float32)])
+    indptr = np.arange(0, (n + b + 1) * k, k, dtype=np.int64)
+    return NeighborTable(indptr, all_indices.ravel(), all_scores.ravel())
+
+
+def add_articles(new_articles:pd.DataFrame, articles:pd.DataFrame, embeddings, neighbors:NeighborTable, indices:pd.DataFrame,
+                 title_index=None, keyword_index=None, fuzzy_index=None, block_size:int=8192):
+    """
+    Append new_articles to the corpus and patch every artifact that depends on it.
+    The new articles get row ids len(articles), len(articles) + 1, ...
+
+    Returns (articles, embeddings, neighbors, indices). title_index,
+    keyword_index and fuzzy_index (a TrigramIndex over title_index), when
+    given, are updated in place.
+    """
+    start = len(articles)
+    new_rows = np.arange(start, start + len(new_articles))
+
+    new_vectors = embeddings.transform(article_texts(new_articles))
+    neighbors = update_neighbors(neighbors, embeddings.vectors, new_vectors, block_size=block_size)
+    embeddings.add(new_vectors)
+
+    articles = pd.concat([articles, new_articles], ignore_index=True)
+    new_indices = pd.DataFrame({indices.columns[0]: new_rows}, index=new_articles.title.str.lower().values)
+    indices = pd.concat([indices, new_indices])
+
+    if title_index is not None:
+        title_index.add(new_articles.title.values, new_rows)
+        if fuzzy_index is not None:
+            fuzzy_index.update()
+    if isinstance(keyword_index, BM25Index):
+        keyword_index.add(new_articles.title.values, start_row=start, abstracts=new_articles.abstract.fillna("").values)
+    elif keyword_index is not None:
+        keyword_index.add(new_articles.title.values, start_row=start)
+    return articles, embeddings, neighbors, indices
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Add new articles to the local corpus artifacts")
+    parser.add_argument("new_articles", help="CSV of new articles, same columns as the articles CSV")
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--articles", default="preprocessed_articles.csv", help="relative to --data-dir")
+    parser.add_argument("--indices", default="indices.csv", help="relative to --data-dir")
+    parser.add_argument("--embeddings", default="embeddings", help="relative to --data-dir")
+    parser.add_argument("--neighbors", default="neighbors", help="relative to --data-dir")
+    parser.add_argument("--bm25", default="bm25", help="relative to --data-dir; updated when present")
+    args = parser.parse_args()
+
+    path = lambda name: os.path.join(args.data_dir, name)
+    new_articles = pd.read_csv(args.new_articles)
+    bm25 = load_bm25_index(path(args.bm25)) if os.path.isdir(path(args.bm25)) else None
+    articles, embeddings, neighbors, indices = add_articles(
+        new_articles,
+        articles=pd.read_csv(path(args.articles)),
+        embeddings=load_embeddings(path(args.embeddings), load_model=True),
+        neighbors=load_neighbor_table(path(args.neighbors)),
+        indices=pd.read_csv(path(args.indices), header=None, index_col=0),
+        keyword_index=bm25,
+    )
+    articles.to_csv(path(args.articles), index=False)
+    indices.to_csv(path(args.indices), header=False)
+    for columnar in ("articles.feather", "articles.parquet"):
+        if os.path.exists(path(columnar)):
+            write_columnar(articles, path(columnar), "articles")
+    save_embeddings(embeddings, path(args.embeddings))
+    save_neighbor_table(neighbors, path(args.neighbors))
+    if bm25 is not None:
+        save_bm25_index(bm25, path(args.bm25))
+    print(f"added {len(new_articles)} articles, corpus is now {len(articles)}")
@@ -1,142 +1,418 @@
+import numpy as np
 import pandas as pd
-import spacy
-from spacy import displacy
-nlp = spacy.load('en_core_web_sm')
-from spacy.lang.en.stop_words import STOP_WORDS
-import en_core_web_sm
 import string
 
+from search import KeywordIndex, TitleIndex, TrigramIndex, tokenize_query
+from interactions import InteractionIndex, build_article_id_map
+from categories import CategoryLookup
+from neighbors import block_top_k
+from cache import ResultCache
+from instrument import stage
+
+def _resolve_category_field(df, category_id, field:str, unique:bool=False):
+    # `df` is the categories frame or a categories.CategoryLookup built from it once
+    lookup = df if isinstance(df, CategoryLookup) else CategoryLookup.from_frame(df)
+    if isinstance(category_id, str):
+        category_id = category_id.split(",")
+    return ",".join(lookup.resolve(field, [c.strip() for c in category_id], unique=unique))
+
 def get_category_name(df=pd.DataFrame, category_id:list="cs.AI"):
-    names = []
-
-    for cat_id in category_id:
-        names.append(df[df["category_id"] == cat_id].category_name.values.tolist())
-        if len(names) == 1:
-            try:
-                return names[0][0]
-            except IndexError:
-                return names[0]
-        else:
-            return ",".join(names)
+    return _resolve_category_field(df, category_id, "category_name")
 
 def get_group_name(df=pd.DataFrame, category_id:list=["cs.AI"]):
-
-    names = []
-    for cat_id in category_id:
-        names.append(df[df["category_id"] == cat_id].group_name.values.tolist())
-        if len(names) == 1:
-            try:
-                return names[0][0]
-            except IndexError:
-                return names[0]
-        else:
-            return ",".join(names)
+    return _resolve_category_field(df, category_id, "group_name", unique=True)
 
 def get_category_description(df=pd.DataFrame, category_id:list=["cs.AI"]):
-    descriptions = []
-    for cat_id in category_id:
-        descriptions.append(df[df["category_id"] == cat_id].category_description.values.tolist())
-        if len(descriptions) == 1:
-            try:
-                return descriptions[0][0]
-            except IndexError:
-                return descriptions[0]
-        else:
-            return ",".join(descriptions)
+    return _resolve_category_field(df, category_id, "category_description")
         
 ### Recommendation utils
-def get_paper_by_keywords(keywords:str, articles):
-    kw_doc = nlp(keywords)
-    words = " ".join([word.text.lower() for word in kw_doc if word.text not in list(STOP_WORDS)])
+# eventType codes used in the interactions table
+EVENT_MAP = {
+    "VIEW": 4,
+    "LIKE": 3,
+    "BOOKMARK": 0,
+    "FOLLOW": 2,
+    "COMMENT CREATED": 1,
+}
+
+# how much each kind of interaction says about a user's interest, for profile scoring
+EVENT_WEIGHTS = {
+    "VIEW": 1.0,
+    "LIKE": 2.0,
+    "BOOKMARK": 2.5,
+    "FOLLOW": 3.0,
+    "COMMENT CREATED": 4.0,
+}
+
+def top_k(scores, k:int=10, exclude=None):
+    """
+    Return the indices and scores of the k largest entries of a 1-D score array,
+    best first, skipping any index listed in `exclude`.
+
+    Uses np.argpartition so only the k winners are sorted: O(N + k log k)
+    instead of a full O(N log N) sort.
+    """
+    scores = np.asarray(scores)
+    exclude = np.empty(0, dtype=np.intp) if exclude is None else np.asarray(exclude, dtype=np.intp).ravel()
+    n = scores.shape[0]
+    m = min(max(k, 0) + exclude.size, n)
+    if m <= 0:
+        return np.empty(0, dtype=np.intp), scores[:0]
+
+    if m < n:
+        candidates = np.argpartition(-scores, m - 1)[:m]
+        candidates.sort()
+    else:
+        candidates = np.arange(n)
+
+    if exclude.size:
+        candidates = candidates[~np.isin(candidates, exclude)]
+
+    # stable sort on ascending candidate ids keeps ties in corpus order
+    order = np.argsort(-scores[candidates], kind="stable")[:k]
+    top = candidates[order]
+    return top, scores[top]
 
-    matches = []
+def similar_items(similarity_matrix, i:int, k:int=10, exclude=None):
+    """
+    Top-k neighbors of item i. `similarity_matrix` is either a dense N x N array
+    (or anything whose [i] is a dense score row) or an object that answers
+    top_k(i, k, exclude) itself, such as neighbors.NeighborTable.
+    """
+    if hasattr(similarity_matrix, "top_k"):
+        return similarity_matrix.top_k(i, k=k, exclude=exclude)
+    return top_k(similarity_matrix[i], k=k, exclude=exclude)
 
-    for t_idx in range(articles.shape[0]):
-        kw_list = words.strip().split()
-        for k in kw_list:
-            if k in articles.title[t_idx].lower().split():
-                matches.append(articles.title[t_idx])
+def weighted_similarity(similarity_matrix, rows, weights):
+    """
+    Aggregate similarity of every item to a weighted set of items:
+    weights @ similarity_matrix[rows], as one matrix-vector product.
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    weights = np.asarray(weights, dtype=np.float64)
+    if hasattr(similarity_matrix, "weighted_sum"):
+        return similarity_matrix.weighted_sum(rows, weights)
+    return weights @ np.asarray(similarity_matrix[rows], dtype=np.float64)
 
-    return matches
+def similar_items_block(similarity_matrix, rows, k:int=10, exclude_self:bool=True, max_block_bytes:int=256 << 20):
+    """
+    Top-k neighbors of many items at once: (len(rows), k) index and score arrays,
+    padded with -1 / nan when fewer than k neighbors exist.
+
+    Dense rows are gathered a block at a time with one fancy index, sized so a
+    block stays under max_block_bytes, and ranked with a row-wise argpartition.
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    if hasattr(similarity_matrix, "top_k_block"):
+        return similarity_matrix.top_k_block(rows, k=k, exclude_self=exclude_self)
+
+    n_cols = similarity_matrix.shape[1]
+    k = min(k, n_cols - 1 if exclude_self else n_cols)
+    block_size = max(1, max_block_bytes // (n_cols * 8))
+    out_idx = np.full((rows.size, k), -1, dtype=np.intp)
+    out_scores = np.full((rows.size, k), np.nan)
+
+    for start in range(0, rows.size, block_size):
+        block_rows = rows[start:start + block_size]
+        block = np.array(similarity_matrix[block_rows], dtype=np.float64)
+        if exclude_self:
+            block[np.arange(block_rows.size), block_rows] = -np.inf
+        idx, scores = block_top_k(block, k)
+        out_idx[start:start + block_rows.size] = idx
+        out_scores[start:start + block_rows.size] = scores
+    return out_idx, out_scores
+
+def search_keywords(keywords:str, articles, keyword_index:KeywordIndex=None, mode:str="any", tokenizer:str="fast", k:int=None):
+    """
+    Row ids of the articles matching the keywords, best match first; only the
+    first k when k is given. Pass the index built at load time (a KeywordIndex
+    over titles or a search.BM25Index over titles and abstracts); without one a
+    KeywordIndex is built on the fly.
+    """
+    if keyword_index is None:
+        with stage("keywords.build_index"):
+            keyword_index = KeywordIndex.from_titles(articles.title.values)
+
+    with stage(f"keywords.tokenize[{tokenizer}]"):
+        tokens = tokenize_query(keywords, tokenizer=tokenizer)
+    with stage("keywords.search"):
+        rows, _ = keyword_index.search(tokens, mode=mode, k=k)
+    return rows
+
+def get_paper_by_keywords(keywords:str, articles, keyword_index:KeywordIndex=None, mode:str="any", tokenizer:str="fast"):
+    rows = search_keywords(keywords, articles, keyword_index=keyword_index, mode=mode, tokenizer=tokenizer)
+    return articles.title.values[rows].tolist()
 
         
-def get_paper_by_title(title:list, indices:pd.DataFrame):
-    title = [t.lower() for t in title]
-    result = []
-    for t in title:
-        try:
-            result.append(indices.loc[t][0])
-        except: 
-            result.append(indices.loc[t][1])
+def get_paper_by_title(title:list, indices:pd.DataFrame, title_index:TitleIndex=None):
+    """
+    Row id of every title (the first one for duplicated titles). Raises KeyError
+    naming the titles that were not found; use TitleIndex.lookup directly for
+    batch lookups that should not raise.
+    """
+    if title_index is None:
+        title_index = TitleIndex.from_indices(indices)
+
+    result = title_index.lookup(title)
+    if (result < 0).any():
+        raise KeyError([t for t, r in zip(title, result) if r < 0])
     
-    return result
+    return result.tolist()
 
 
-def get_recommendation_list(similarity_matrix, indices, title_or_keyword:str, df:pd.DataFrame, k:int=10):
-    i = -1
+def resolve_query(title_or_keyword:str, df:pd.DataFrame, indices, keyword_index:KeywordIndex=None, title_index:TitleIndex=None,
+                  fuzzy_index:TrigramIndex=None, fuzzy_threshold:float=0.5, fuzzy_max_candidates:int=None):
+    """
+    Seed article of a query: an exact title match, else the closest title by
+    trigram similarity (with fuzzy_index), else the best keyword match, else a
+    random article. Returns (row, title, exact_match, is_random, match_score);
+    match_score is 1.0 for exact and the trigram similarity for fuzzy title
+    matches, None otherwise. Fuzzy matches count as title matches.
+    fuzzy_max_candidates overrides the fuzzy index's cap on scanned postings
+    (TrigramIndex.search), so unspecific queries go straight to keywords.
+    """
     title = title_or_keyword
-    exact_match = False
-    try:
-        # search using title
-        i = get_paper_by_title(title=[title], indices=indices)[0]
-        exact_match = True
-
-    except:
-        title = get_paper_by_keywords(keywords=title_or_keyword, articles=df)
-        if title == []:
-            title="random"
-            t = indices.sample(n=1).index[0]
-            i  = get_paper_by_title(title=[t], indices=indices)[0]
-            exact_match = True
-        else:
-            i = get_paper_by_title(title=title, indices=indices)[0]
-        
-    # print(title, i, exact_match)
-        
+    # search using title
+    with stage("resolve.title_lookup"):
+        i = int(title_index.lookup([title])[0])
+    if i >= 0:
+        return i, title, True, False, 1.0
 
-    scores = enumerate(similarity_matrix[i])
-    scores = sorted(scores, key=lambda x: x[1], reverse=True)
-    if exact_match:
-        scores = scores[1:k]
-    else:
-        scores = scores[:k]
+    if fuzzy_index is not None:
+        with stage("resolve.fuzzy_title"):
+            rows, scores = fuzzy_index.search(title, k=1, threshold=fuzzy_threshold, max_candidates=fuzzy_max_candidates)
+        if len(rows):
+            i = int(rows[0])
+            return i, df.title.values[i], True, False, float(scores[0])
 
-    
-    similar_papers_indices = [sim[0] for sim in scores]
-    recommendations = df.iloc[similar_papers_indices]
-    recommendations["score"] = [sim[1] for sim in scores]
+    # only the seed is needed, so the index ranks just the best match
+    matches = search_keywords(keywords=title_or_keyword, articles=df, keyword_index=keyword_index, k=1)
+    if len(matches) == 0:
+        # nothing matched: recommend around a random article
+        i = int(indices.sample(n=1).iloc[0, 0])
+        return i, df.title.values[i], True, True, None
+
+    # best keyword match is the seed
+    i = int(matches[0])
+    return i, df.title.values[i], False, False, None
+
+def get_recommendation_list(similarity_matrix, indices, title_or_keyword:str, df:pd.DataFrame, k:int=10, keyword_index:KeywordIndex=None, title_index:TitleIndex=None, cache:ResultCache=None,
+                            fuzzy_index:TrigramIndex=None):
+    """
+    `cache` is an optional ResultCache holding query resolutions and top-k
+    results; bind it to the artifact version so reloads invalidate it.
+    How the query was resolved (see resolve_query) is returned in
+    recommendations.attrs["query"].
+    """
+    if title_index is None:
+        with stage("resolve.build_title_index"):
+            title_index = TitleIndex.from_indices(indices)
+
+    resolved = cache.get(("query", title_or_keyword)) if cache is not None else None
+    if resolved is None:
+        resolved = resolve_query(title_or_keyword, df, indices, keyword_index=keyword_index, title_index=title_index, fuzzy_index=fuzzy_index)
+        # random fallbacks are not remembered, so the next rerun draws again
+        if cache is not None and not resolved[3]:
+            cache.put(("query", title_or_keyword), resolved)
+    i, title, exact_match, is_random, match_score = resolved
+
+    # the query article (and any duplicate of its title) is dropped by index,
+    # not by assuming it sorts first
+    exclude = np.union1d([i], title_index.lookup_all(title)) if exact_match else None
+    n = k - 1 if exact_match else k
+
+    key = ("top_k", i, n, None if exclude is None else tuple(exclude.tolist()))
+    result = cache.get(key) if cache is not None else None
+    if result is None:
+        with stage("top_k"):
+            result = similar_items(similarity_matrix, i, k=n, exclude=exclude)
+        if cache is not None:
+            cache.put(key, result)
+    similar_papers_indices, scores = result
+
+    with stage("result_frame"):
+        recommendations = df.iloc[similar_papers_indices].assign(score=scores)
+    recommendations.attrs["query"] = {"seed_row": i, "seed_title": title, "random": is_random, "match_score": match_score}
     
     return recommendations
     
-def get_article_title_by_id(article_id:str, articles:pd.DataFrame):
+def get_recommendation_lists(
+    similarity_matrix,
+    indices,
+    queries:list,
+    df:pd.DataFrame,
+    k:int=10,
+    by:str="title",
+    title_index:TitleIndex=None,
+    article_ids:dict=None):
+    """
+    Recommendations for many queries in one call. `queries` are titles
+    (by="title") or article ids (by="id"); they are resolved in one batch lookup,
+    their similarity rows gathered in blocks and ranked with vectorized top-k.
+    Unlike get_recommendation_list, exactly k neighbors (the query itself excluded)
+    are returned per query.
+
+    Returns a tidy frame with one row per (query, rank): query, query_row, rank,
+    row, id, title, score. Queries that do not resolve are left out.
+    """
+    queries = list(queries)
+    if by == "title":
+        if title_index is None:
+            title_index = TitleIndex.from_indices(indices)
+        query_rows = title_index.lookup(queries)
+    elif by == "id":
+        if article_ids is None:
+            article_ids = build_article_id_map(df)
+        query_rows = np.fromiter((article_ids.get(q, -1) for q in queries), dtype=np.int64, count=len(queries))
+    else:
+        raise ValueError(f"unknown query type {by!r}, expected 'title' or 'id'")
+
+    found = np.flatnonzero(query_rows >= 0)
+    idx, scores = similar_items_block(similarity_matrix, query_rows[found], k=k)
+
+    n_found, width = idx.shape
+    valid = (idx >= 0).ravel()
+    rows = idx.ravel()[valid]
+    query_pos = np.repeat(found, width)[valid]
+    return pd.DataFrame({
+        "query": np.asarray(queries, dtype=object)[query_pos],
+        "query_row": query_rows[query_pos],
+        "rank": np.tile(np.arange(1, width + 1), n_found)[valid],
+        "row": rows,
+        "id": df["id"].values[rows],
+        "title": df.title.values[rows],
+        "score": scores.ravel()[valid],
+    })
+
+def get_article_title_by_id(article_id:str, articles:pd.DataFrame, article_ids:dict=None):
+    # article_ids is the contentId -> row map from interactions.build_article_id_map
+    if article_ids is not None:
+        return articles.title.values[article_ids[article_id]]
     return articles[articles["id"]==article_id].title.values[0]
 
+def get_user_history(user_id:int, interactions:pd.DataFrame, event_id:int=None, interaction_index:InteractionIndex=None):
+    # contentIds of a user's interactions, optionally of a single event type
+    if interaction_index is not None:
+        return interaction_index.history(user_id, event_id)
+    mask = interactions["personId"] == user_id
+    if event_id is not None:
+        mask &= interactions["eventType"] == event_id
+    return interactions.contentId.values[mask.values]
+
 def get_personalized_recommendations(
     user_id:int, 
     interactions:pd.DataFrame, 
     articles:pd.DataFrame,
     similarity_matrix, 
     indices,
-    eventType:str="LIKE"):
+    eventType:str="LIKE",
+    title_index:TitleIndex=None,
+    interaction_index:InteractionIndex=None,
+    article_ids:dict=None,
+    mode:str="single",
+    k:int=10,
+    event_weights:dict=None,
+    half_life:float=None):
+    """
+    mode="single" recommends neighbors of one random article the user interacted
+    with through `eventType` (falling back to views). mode="profile" scores every
+    article against the user's whole history at once; see get_profile_recommendations.
+
+    Returns (recommendations, query title, user_id).
+    """
+    if mode == "profile":
+        recommendations, a_t = get_profile_recommendations(
+            user_id=user_id,
+            interactions=interactions,
+            articles=articles,
+            similarity_matrix=similarity_matrix,
+            k=k,
+            interaction_index=interaction_index,
+            article_ids=article_ids,
+            event_weights=event_weights,
+            half_life=half_life,
+        )
+        return recommendations, a_t, user_id
+    elif mode != "single":
+        raise ValueError(f"unknown mode {mode!r}, expected 'single' or 'profile'")
     
-    event_map = {
-        "VIEW": 4,
-        "LIKE": 3,
-        "BOOKMARK": 0,
-        "FOLLOW": 2,
-        "COMMENT CREATED": 1,
-    }
+    event_map = EVENT_MAP
     
     event_id = event_map[eventType]
     # get user interactions
-    user_interactions = interactions[(interactions["personId"] == user_id) & (interactions["eventType"]==event_id)]
-    if user_interactions.shape[0] == 0:
-        # look for viewed articles 
-        user_interactions = interactions[(interactions["personId"] == user_id) & (interactions["eventType"]==4)]
+    with stage("personalized.history"):
+        user_interactions = get_user_history(user_id, interactions, event_id, interaction_index=interaction_index)
+        if len(user_interactions) == 0:
+            # look for viewed articles 
+            user_interactions = get_user_history(user_id, interactions, event_map["VIEW"], interaction_index=interaction_index)
 
     # pick a random article from those articles the current user have liked
-    a_id = user_interactions.contentId.sample(n=1).values[0]
+    a_id = user_interactions[np.random.randint(len(user_interactions))]
     # get artilcle title by id
-    a_t = get_article_title_by_id(article_id=a_id, articles=articles)
+    with stage("personalized.article_title"):
+        a_t = get_article_title_by_id(article_id=a_id, articles=articles, article_ids=article_ids)
         
-    return get_recommendation_list(title_or_keyword=a_t, df=articles, indices=indices, similarity_matrix=similarity_matrix), a_t, user_id
\ No newline at end of file
+    return get_recommendation_list(title_or_keyword=a_t, df=articles, indices=indices, similarity_matrix=similarity_matrix, k=k, title_index=title_index), a_t, user_id
+
+def get_profile_recommendations(
+    user_id:int,
+    interactions:pd.DataFrame,
+    articles:pd.DataFrame,
+    similarity_matrix,
+    k:int=10,
+    interaction_index:InteractionIndex=None,
+    article_ids:dict=None,
+    event_weights:dict=None,
+    half_life:float=None,
+    time_col:str="timestamp"):
+    """
+    Score every article against the user's whole history in one weighted
+    similarity product. Each interaction counts with the weight of its event type
+    (EVENT_WEIGHTS by default) and, if half_life is given, decays by half every
+    half_life units of `time_col` before the user's latest interaction. Articles
+    already in the history are excluded, whatever their event's weight.
+
+    The score is the weighted mean similarity to the history, so it stays in the
+    same range as single-article scores. Returns (recommendations, title of the
+    most heavily weighted history article).
+    """
+    event_weights = EVENT_WEIGHTS if event_weights is None else event_weights
+    if article_ids is None:
+        article_ids = build_article_id_map(articles)
+
+    with stage("profile.history"):
+        if interaction_index is not None:
+            positions = interaction_index.history_rows(user_id)
+        else:
+            positions = np.flatnonzero((interactions["personId"] == user_id).values)
+
+        content_ids = interactions.contentId.values[positions]
+        rows = np.fromiter((article_ids.get(c, -1) for c in content_ids), dtype=np.int64, count=len(content_ids))
+
+    # per-interaction weights from a keyed array over event codes
+    weight_by_event = np.zeros(max(EVENT_MAP.values()) + 1)
+    for name, code in EVENT_MAP.items():
+        weight_by_event[code] = event_weights.get(name, 0.0)
+    weights = weight_by_event[interactions.eventType.values[positions].astype(np.int64)]
+    if half_life is not None and time_col in interactions:
+        times = interactions[time_col].values[positions].astype(np.float64)
+        weights = weights * 0.5 ** ((times.max() - times) / half_life)
+
+    known = (rows >= 0) & (weights > 0)
+    if not known.any():
+        return articles.iloc[:0].assign(score=np.empty(0)), None
+
+    # one weight per distinct history article
+    history, inverse = np.unique(rows[known], return_inverse=True)
+    item_weights = np.bincount(inverse, weights=weights[known])
+
+    with stage("profile.scores"):
+        scores = weighted_similarity(similarity_matrix, history, item_weights) / item_weights.sum()
+    with stage("top_k"):
+        # every article seen is excluded, zero-weighted events included
+        recommended, top_scores = top_k(scores, k=k, exclude=np.unique(rows[rows >= 0]))
+
+    a_t = articles.title.values[history[np.argmax(item_weights)]]
+    with stage("result_frame"):
+        recommendations = articles.iloc[recommended].assign(score=top_scores)
+    return recommendations, a_t
@@ -1,11 +1,10 @@
 import pandas as pd
-import spacy
-from spacy import displacy
-nlp = spacy.load('en_core_web_sm')
-from spacy.lang.en.stop_words import STOP_WORDS
-import en_core_web_sm
 import string
 
+# one stop-word list and tokenizer for both apps; the spaCy model is only
+# loaded when tokenizer="spacy" is asked for
+from demoApp.search import STOP_WORDS, get_nlp, get_stop_words, tokenize_query
+
 def get_category_name(df=pd.DataFrame, category_id:list="cs.AI"):
     names = []
 
@@ -45,9 +44,8 @@ def get_category_description(df=pd.DataFrame, category_id:list=["cs.AI"]):
             return ",".join(descriptions)
         
 ### Recommendation utils
-def get_paper_by_keywords(keywords:str, articles):
-    kw_doc = nlp(keywords)
-    words = " ".join([word.text.lower() for word in kw_doc if word.text not in list(STOP_WORDS)])
+def get_paper_by_keywords(keywords:str, articles, tokenizer:str="fast"):
+    words = " ".join(tokenize_query(keywords, tokenizer=tokenizer))
 
     matches = []
 